@@ -0,0 +1,428 @@
+"""
+Memory allocators
+
+Every allocator manages addresses [0, total) and has the same interface as the
+original first-fit memory: allocate(mem_need) returns a starting address or
+"Failure", free(mem_length, mem_start) gives a block back, and free_extents()
+lists the holes as (start, length) in address order. A size below 1 is a
+ValueError.
+"""
+
+
+class FirstFitMemory(object):
+    """
+    First fit over holes in the order the original list kept them, in
+    O(log holes) per call
+
+    The original allocator scanned a list of holes from the front, appended a
+    freed block to its end and, when holes merged, kept the lower addressed
+    one where it was. Here every hole has a position in that order, and a max
+    segment tree over positions holds each hole's length, so allocate walks
+    down to the first position whose hole is big enough. Holes are also
+    indexed by start and by end, so a freed block finds its neighbours
+    directly. Positions are renumbered when they run out.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self._by_start = {}  # start -> (length, position)
+        self._by_end = {}  # end -> start
+        self._next = 0  # Position a freed block gets
+        self._start_at = []
+        self._renumber()
+        self._add_hole(0, total, self._new_position())
+
+    @property
+    def free_mem(self):
+        """
+        :return: holes as {"start", "length"} in the original list's order
+        """
+        starts = self._start_at[:self._next]
+        return [{"start": start, "length": self._by_start[start][0]} for start in starts if start is not None]
+
+    def _renumber(self):
+        starts = [start for start in self._start_at[:self._next] if start is not None]
+        size = 16
+        while size < 2 * (len(starts) + 1):
+            size *= 2
+        self._size = size  # Leaves in segment tree
+        self._tree = tree = [0] * (2 * size)
+        self._start_at = starts + [None] * (size - len(starts))  # position -> start of hole there
+        for position, start in enumerate(starts):
+            length = self._by_start[start][0]
+            self._by_start[start] = (length, position)
+            tree[size + position] = length
+        for position in range(size - 1, 0, -1):
+            tree[position] = max(tree[2 * position], tree[2 * position + 1])
+        self._next = len(starts)
+
+    def _new_position(self):
+        if self._next == self._size:
+            self._renumber()
+        self._next += 1
+        return self._next - 1
+
+    def _set(self, position, length):
+        tree = self._tree
+        position += self._size
+        tree[position] = length
+        position >>= 1
+        while position:
+            largest = max(tree[2 * position], tree[2 * position + 1])
+            if tree[position] == largest:
+                break
+            tree[position] = largest
+            position >>= 1
+
+    def _add_hole(self, start, length, position):
+        self._by_start[start] = (length, position)
+        self._by_end[start + length] = start
+        self._start_at[position] = start
+        self._set(position, length)
+
+    def _remove_hole(self, start):
+        length, position = self._by_start.pop(start)
+        del self._by_end[start + length]
+        self._start_at[position] = None
+        self._set(position, 0)
+        return length, position
+
+    def allocate(self, mem_need):
+        """
+        Allocate memory for a process
+
+        :return: Starting address or "Failure"
+        """
+        if mem_need <= 0:
+            raise ValueError("Can not allocate {0} units of memory".format(mem_need))
+        tree = self._tree
+        if tree[1] < mem_need:
+            return "Failure"
+        position = 1
+        while position < self._size:
+            position *= 2
+            if tree[position] < mem_need:
+                position += 1
+        start = self._start_at[position - self._size]
+
+        # What is left of the hole keeps its place
+        length, position = self._remove_hole(start)
+        if length > mem_need:
+            self._add_hole(start + mem_need, length - mem_need, position)
+        return start
+
+    def free(self, mem_length, mem_start):
+        """
+        Free memory for a process
+
+        :return: None
+        """
+        if mem_length <= 0:
+            raise ValueError("Can not free {0} units of memory".format(mem_length))
+        start, end = mem_start, mem_start + mem_length
+        position = None
+        if start in self._by_end:
+            # Merged into the hole below, which keeps its place
+            start = self._by_end[start]
+            _, position = self._remove_hole(start)
+        if end in self._by_start:
+            end += self._remove_hole(end)[0]
+        if position is None:
+            position = self._new_position()
+        self._add_hole(start, end - start, position)
+
+    def free_extents(self):
+        """
+        :return: list of (start, length) of holes in address order
+        """
+        return sorted((start, length) for start, (length, _) in self._by_start.items())
+
+
+class AddressOrderedFirstFitMemory(object):
+    """
+    First fit over holes in address order, in O(log total) per call
+
+    FirstFitMemory takes holes in the original list's order, which after
+    frees and merges is not address order, so the two can hand out different addresses
+    for the same requests; this is a different policy, not a faster copy.
+
+    Holes are indexed by start and by end, so a freed block finds its
+    neighbours directly. A max segment tree over addresses holds each hole's
+    length at its start address; allocate walks down from the root, always
+    taking the left subtree if its largest hole is big enough, which gives the
+    lowest addressed hole that fits.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self._size = 1 << max(0, (total - 1).bit_length())  # Leaves in segment tree
+        self._tree = [0] * (2 * self._size)
+        self._by_start = {}  # start -> length
+        self._by_end = {}  # end -> start
+        self._add_hole(0, total)
+
+    @property
+    def free_mem(self):
+        return [{"start": start, "length": length} for start, length in self.free_extents()]
+
+    def _set(self, position, length):
+        tree = self._tree
+        position += self._size
+        tree[position] = length
+        position >>= 1
+        while position:
+            largest = max(tree[2 * position], tree[2 * position + 1])
+            if tree[position] == largest:
+                break
+            tree[position] = largest
+            position >>= 1
+
+    def _add_hole(self, start, length):
+        self._by_start[start] = length
+        self._by_end[start + length] = start
+        self._set(start, length)
+
+    def _remove_hole(self, start):
+        length = self._by_start.pop(start)
+        del self._by_end[start + length]
+        self._set(start, 0)
+        return length
+
+    def allocate(self, mem_need):
+        """
+        Allocate memory for a process
+
+        :return: Starting address or "Failure"
+        """
+        if mem_need <= 0:
+            raise ValueError("Can not allocate {0} units of memory".format(mem_need))
+        tree = self._tree
+        if tree[1] < mem_need:
+            return "Failure"
+        position = 1
+        while position < self._size:
+            position *= 2
+            if tree[position] < mem_need:
+                position += 1
+        start = position - self._size
+
+        length = self._remove_hole(start)
+        if length > mem_need:
+            self._add_hole(start + mem_need, length - mem_need)
+        return start
+
+    def free(self, mem_length, mem_start):
+        """
+        Free memory for a process
+
+        :return: None
+        """
+        if mem_length <= 0:
+            raise ValueError("Can not free {0} units of memory".format(mem_length))
+        start, end = mem_start, mem_start + mem_length
+        if start in self._by_end:
+            start = self._by_end[start]
+            self._remove_hole(start)
+        if end in self._by_start:
+            end += self._remove_hole(end)
+        self._add_hole(start, end - start)
+
+    def free_extents(self):
+        """
+        :return: list of (start, length) of holes in address order
+        """
+        return sorted(self._by_start.items())
+
+
+class BuddyMemory(object):
+    """
+    Binary buddy allocator
+
+    Requests are rounded up to a power of two. A free block of order k lives in
+    self._free[k]; splitting and merging walk at most log2(total) orders and
+    a block's buddy is found with one xor. A total that is not a power of two
+    is covered by the largest aligned blocks that fit.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self._free = [set() for _ in range(max(1, total.bit_length()))]  # order -> free block starts
+        self._order_of = {}  # start of free block -> order
+        start = 0
+        while start < total:
+            # Largest aligned block that starts here and fits
+            order = (total - start).bit_length() - 1
+            if start:
+                order = min(order, (start & -start).bit_length() - 1)
+            self._add_free(start, order)
+            start += 1 << order
+
+    @staticmethod
+    def order_for(mem_need):
+        """
+        :return: order of the smallest block holding mem_need units
+        """
+        return max(0, (mem_need - 1).bit_length())
+
+    def _add_free(self, start, order):
+        self._free[order].add(start)
+        self._order_of[start] = order
+
+    def _remove_free(self, start, order):
+        self._free[order].discard(start)
+        del self._order_of[start]
+
+    def allocate(self, mem_need):
+        """
+        Allocate memory for a process
+
+        :return: Starting address or "Failure"
+        """
+        if mem_need <= 0:
+            raise ValueError("Can not allocate {0} units of memory".format(mem_need))
+        order = self.order_for(mem_need)
+        for found in range(order, len(self._free)):
+            if self._free[found]:
+                break
+        else:
+            return "Failure"
+
+        start = self._free[found].pop()
+        del self._order_of[start]
+        # Split down to the order needed, keeping the lower half each time
+        while found > order:
+            found -= 1
+            self._add_free(start + (1 << found), found)
+        return start
+
+    def free(self, mem_length, mem_start):
+        """
+        Free memory for a process
+
+        :return: None
+        """
+        if mem_length <= 0:
+            raise ValueError("Can not free {0} units of memory".format(mem_length))
+        start, order = mem_start, self.order_for(mem_length)
+        while order + 1 < len(self._free):
+            buddy = start ^ (1 << order)
+            if self._order_of.get(buddy) != order:
+                break
+            self._remove_free(buddy, order)
+            start = min(start, buddy)
+            order += 1
+        self._add_free(start, order)
+
+    def free_extents(self):
+        """
+        :return: list of (start, length) of holes in address order
+        """
+        return sorted((start, 1 << order) for start, order in self._order_of.items())
+
+
+class SegregatedFitMemory(object):
+    """
+    Segregated free lists with boundary tags
+
+    Holes are kept in size classes by power of two, so allocate only looks at
+    log2(total) classes. Every hole is indexed by its start and its end, so a
+    freed block merges with its neighbours in constant time.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self._classes = [dict() for _ in range(max(1, total.bit_length()))]  # class -> {start: length}
+        self._by_start = {}  # start -> length
+        self._by_end = {}  # end -> start
+        self._add_hole(0, total)
+
+    def _add_hole(self, start, length):
+        self._classes[length.bit_length() - 1][start] = length
+        self._by_start[start] = length
+        self._by_end[start + length] = start
+
+    def _remove_hole(self, start):
+        length = self._by_start.pop(start)
+        del self._by_end[start + length]
+        del self._classes[length.bit_length() - 1][start]
+        return length
+
+    def allocate(self, mem_need):
+        """
+        Allocate memory for a process
+
+        :return: Starting address or "Failure"
+        """
+        if mem_need <= 0:
+            raise ValueError("Can not allocate {0} units of memory".format(mem_need))
+        hole = None
+        # Every hole in these classes is big enough, take any
+        for size_class in self._classes[(mem_need - 1).bit_length():]:
+            if size_class:
+                hole = size_class.popitem()
+                break
+        else:
+            # Only some holes in the class of mem_need itself may fit
+            if mem_need.bit_length() > len(self._classes):
+                return "Failure"  # Bigger than all of memory
+            size_class = self._classes[mem_need.bit_length() - 1]
+            for start, length in size_class.items():
+                if length >= mem_need:
+                    hole = start, length
+                    break
+            if hole is None:
+                return "Failure"
+            del size_class[hole[0]]
+
+        start, length = hole
+        del self._by_start[start]
+        del self._by_end[start + length]
+        if length > mem_need:
+            self._add_hole(start + mem_need, length - mem_need)
+        return start
+
+    def free(self, mem_length, mem_start):
+        """
+        Free memory for a process
+
+        :return: None
+        """
+        if mem_length <= 0:
+            raise ValueError("Can not free {0} units of memory".format(mem_length))
+        start, end = mem_start, mem_start + mem_length
+        if start in self._by_end:
+            start = self._by_end[start]
+            self._remove_hole(start)
+        if end in self._by_start:
+            end += self._remove_hole(end)
+        self._add_hole(start, end - start)
+
+    def free_extents(self):
+        """
+        :return: list of (start, length) of holes in address order
+        """
+        return sorted(self._by_start.items())
+
+
+MEMORY_BACKENDS = {
+    'first-fit': FirstFitMemory,
+    'address-first-fit': AddressOrderedFirstFitMemory,
+    'buddy': BuddyMemory,
+    'segregated-fit': SegregatedFitMemory,
+}
+
+
+def make_memory(backend, total):
+    """
+    Create a memory allocator
+
+    :param backend: one of MEMORY_BACKENDS
+    :param total: number of memory units
+    :return: allocator instance
+    """
+    try:
+        allocator = MEMORY_BACKENDS[backend]
+    except KeyError:
+        raise ValueError("Unknown memory backend {0!r}, choose from {1}".format(
+            backend, ", ".join(sorted(MEMORY_BACKENDS))))
+    return allocator(total)
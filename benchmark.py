@@ -0,0 +1,255 @@
+"""
+Benchmarks of the scheduler hot paths
+
+Micro benchmarks time one operation at a time: ReadyPool.get and
+change_priority, Memory allocate/free on fragmented memory for every backend,
+Pool.remove, and the Qt table models' edit/remove on an offscreen platform
+(skipped when PyQt5 is missing). Macro benchmarks run whole headless
+simulations of 10 to 1M jobs. Every benchmark keeps the fastest of --repeat
+rounds, each starting from the same state.
+
+    python benchmark.py --out results.json
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json
+
+With --baseline, every result slower than the baseline by more than
+--tolerance is reported, and so is every benchmark only one side has; either
+makes the exit status 1. Timings only compare on the same machine and Python,
+so no baseline is checked in: save one on the machine that will run the
+comparison (with PyQt5 installed if it will be), before making changes.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from allocators import MEMORY_BACKENDS, make_memory
+from engine import Engine, Pool, ReadyPool, HeapReadyPool, LazyAgingReadyPool, random_job
+from policies import make_ready_pool
+
+TOLERANCE = 0.25  # Slowdown reported as a regression
+MACRO_SIZES = (10, 1000, 100000, 1000000)
+
+
+def _timed(operation, count, repeat, setup=None):
+    """
+    :param operation: callable doing one operation
+    :param count: operations per round
+    :param repeat: rounds
+    :param setup: callable run untimed before each round, so every round starts from the same state
+    :return: seconds per operation of the fastest round
+    """
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(count):
+            operation()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / count
+
+
+def _ready_pool(pool_class, size):
+    random.seed(size)
+    pool = pool_class(max=size)
+    for pid in range(1, size + 1):
+        pool.add(random_job(pid))
+    return pool
+
+
+def bench_ready_pool(repeat):
+    results = {}
+    for pool_class in (ReadyPool, HeapReadyPool, LazyAgingReadyPool):
+        for size in (5, 1000):
+            pool = [None]
+
+            def fresh():
+                pool[0] = _ready_pool(pool_class, size)
+
+            def get():
+                pool[0].get()
+
+            def dispatch():
+                pool[0].change_priority(pool[0].get())
+
+            results["{0}.get[{1}]".format(pool_class.__name__, size)] = _timed(get, 200, repeat, fresh)
+            results["{0}.get+change_priority[{1}]".format(pool_class.__name__, size)] = _timed(dispatch, 200,
+                                                                                              repeat, fresh)
+    return results
+
+
+def bench_memory(repeat, info):
+    """
+    :param info: dict filled with name -> {'holes': holes in memory while timed}
+    """
+    results = {}
+    for backend in sorted(MEMORY_BACKENDS):
+        for total in (1 << 12, 1 << 20):
+            random.seed(total)
+            memory = make_memory(backend, total)
+            blocks = []
+            while True:
+                size = random.randint(1, 64)
+                start = memory.allocate(size)
+                if start == "Failure":
+                    break
+                blocks.append((size, start))
+            # Free every other block so holes are scattered all over memory
+            for size, start in blocks[::2]:
+                memory.free(size, start)
+            sizes = [random.randint(1, 64) for _ in range(1024)]
+            position = [0]
+
+            def cycle():
+                size = sizes[position[0] & 1023]
+                position[0] += 1
+                start = memory.allocate(size)
+                if start != "Failure":
+                    memory.free(size, start)
+
+            name = "memory.{0}.allocate+free[{1} units]".format(backend, total)
+            info[name] = {'holes': len(memory.free_extents())}
+            results[name] = _timed(cycle, 200, repeat)
+    return results
+
+
+def bench_pool(repeat, size=100000):
+    pool = Pool()
+    jobs = [random_job(pid) for pid in range(1, size + 1)]
+    for job in jobs:
+        pool.add(job)
+    position = [0]
+
+    def remove_and_add():
+        job = jobs[position[0] % size]
+        position[0] += 7919  # Spread over the pool
+        pool.remove(job.pid)
+        pool.add(job)
+
+    return {"Pool.remove+add[{0}]".format(size): _timed(remove_and_add, 1000, repeat)}
+
+
+def bench_table_model(repeat, size=10000):
+    try:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5.QtWidgets import QApplication, QTableView
+        import simulation
+    except ImportError:
+        return {}
+    app = QApplication.instance() or QApplication(sys.argv)
+    model = simulation.ReadyTableModel([('PID', 'pid'), ('作业名称', 'name'), ('状态', 'status'),
+                                        ('优先权', 'priority'), ('要求运行时间', 'required_time')])
+    view = QTableView()
+    view.setModel(model)
+    jobs = [random_job(pid) for pid in range(1, size + 1)]
+    model.extend(jobs)
+    position = [0]
+
+    def edit():
+        job = jobs[position[0] % size]
+        position[0] += 7919
+        model.edit([job], 3)
+
+    def remove_and_append():
+        job = jobs[position[0] % size]
+        position[0] += 7919
+        model.remove(job)
+        model.append(job)
+
+    results = {"PoolTableModel.edit[{0}]".format(size): _timed(edit, 1000, repeat),
+               "PoolTableModel.remove+append[{0}]".format(size): _timed(remove_and_append, 200, repeat)}
+    view.deleteLater()
+    app.processEvents()
+    return results
+
+
+def bench_macro(sizes, repeat, mode='priority'):
+    """
+    :return: dict of name -> seconds per dispatch of the fastest of repeat runs
+    """
+    results = {}
+    for size in sizes:
+        best = None
+        for _ in range(repeat):
+            random.seed(size)
+            engine = Engine(ready_pool=make_ready_pool(mode))
+            for pid in range(1, size + 1):
+                engine.submit(random_job(pid))
+            started = time.perf_counter()
+            engine.run()
+            elapsed = (time.perf_counter() - started) / engine.ticks
+            best = elapsed if best is None else min(best, elapsed)
+        results["engine.{0}[{1} jobs]".format(mode, size)] = best
+    return results
+
+
+def run(sizes, repeat):
+    """
+    :return: (dict of benchmark name -> seconds per operation (per dispatch for macro benchmarks),
+              dict of benchmark name -> details of what was measured)
+    """
+    results = {}
+    info = {}
+    results.update(bench_ready_pool(repeat))
+    results.update(bench_memory(repeat, info))
+    results.update(bench_pool(repeat))
+    results.update(bench_table_model(repeat))
+    results.update(bench_macro(sizes, repeat))
+    return results, info
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    :return: (list of (name, baseline seconds, seconds, ratio) slower than tolerance allows,
+              sorted names only in results, sorted names only in baseline)
+    """
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        before = baseline.get(name)
+        if before:
+            ratio = seconds / before
+            if ratio > 1 + tolerance:
+                regressions.append((name, before, seconds, ratio))
+    added = sorted(set(results) - set(baseline))
+    missing = sorted(set(baseline) - set(results))
+    return regressions, added, missing
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the scheduler hot paths")
+    parser.add_argument("--sizes", type=int, nargs='*', default=list(MACRO_SIZES),
+                        help="jobs in each headless run")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds of each benchmark, best is kept")
+    parser.add_argument("--out", default=None, help="write results as JSON")
+    parser.add_argument("--save-baseline", default=None, help="write results as a new baseline")
+    parser.add_argument("--baseline", default=None, help="baseline to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="slowdown allowed, 0.25 is 25%%")
+    args = parser.parse_args()
+
+    results, info = run(args.sizes, args.repeat)
+    document = {'python': platform.python_version(), 'machine': platform.machine(), 'results': results,
+                'info': info}
+    for name, seconds in sorted(results.items()):
+        details = " ".join("{0}={1}".format(key, value) for key, value in sorted(info.get(name, {}).items()))
+        print("{0:60} {1:12.3f} us {2}".format(name, seconds * 1e6, details))
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w') as out:
+                json.dump(document, out, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions, added, missing = compare(results, baseline, args.tolerance)
+        for name, before, seconds, ratio in regressions:
+            print("REGRESSION {0}: {1:.3f} us -> {2:.3f} us ({3:.2f}x)".format(name, before * 1e6, seconds * 1e6,
+                                                                             ratio))
+        for name in added:
+            print("NOT IN BASELINE {0}".format(name))
+        for name in missing:
+            print("MISSING {0}".format(name))
+        sys.exit(1 if regressions or added or missing else 0)
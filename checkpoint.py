@@ -0,0 +1,247 @@
+"""
+Checkpoints of headless simulations
+
+A checkpoint holds everything needed to carry on a run exactly where it
+stopped: the engine with its pools, policy state, memory, event queue and
+observers, plus the random module's state and pcb.pid_allocator. Jobs, which
+are most of it, are stored apart as columns of typed arrays keyed by PID, and
+the rest refers to them by PID.
+
+A file starts with a header (magic, format version, full or delta) and the
+rest is zlib compressed. A delta checkpoint holds only the jobs that changed
+since the checkpoint before it, named in its header together with a digest
+of that file, so a chain of deltas is read back from the full one at its
+start. Observers with checkpointed = False, such as a tracing.EventTracer,
+are left out and have to be subscribed again to the loaded engine; other
+observers holding open files, such as a traces.TraceReplay, can not be saved.
+
+    checkpointer = Checkpointer(engine)
+    engine.run(until=100000)
+    checkpointer.save('warm.ckpt')
+    engine.run(until=200000)
+    checkpointer.save('warm.ckpt.1', delta=True)
+
+    what_if = load('warm.ckpt')  # or fork(engine) without a file
+"""
+import hashlib
+import io
+import os
+import pickle
+import random
+import struct
+import zlib
+from array import array
+import pcb
+from engine import pcb_factory
+from pcb import PCB, CompactPCB, PCBView, STATUSES, STATUS_CODES
+
+MAGIC = b'SIMCKPT\0'
+FORMAT_VERSION = 1
+FULL, DELTA = 0, 1
+HEADER = struct.Struct('<8sHB32sH')  # magic, version, full or delta, digest of base, length of base name
+JOB_KINDS = {PCB: 'object', CompactPCB: 'compact', PCBView: 'table'}  # See engine.pcb_factory
+COLUMNS = (('pid', 'q'), ('priority', 'd'), ('required_time', 'q'), ('status', 'b'), ('age', 'q'),
+           ('required_memory', 'q'), ('allocated_memory_start', 'q'))  # Order of a job's row, then its name
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, jobs):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.jobs = jobs
+
+    def persistent_id(self, obj):
+        if type(obj) not in JOB_KINDS:
+            return None
+        pid = obj.pid
+        seen = self.jobs.setdefault(pid, obj)
+        if seen is not obj:
+            raise ValueError("Can not checkpoint two jobs with PID {0}".format(pid))
+        return pid
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, jobs):
+        super().__init__(file)
+        self.jobs = jobs
+
+    def persistent_load(self, pid):
+        return self.jobs[pid]
+
+
+def _raw_name(job):
+    # None for names worked out from PID, so they stay that way
+    return job.table.names[job.row] if type(job) is PCBView else job._name
+
+
+def _row(job):
+    start = job.allocated_memory_start
+    return (job.pid, job.priority, job.required_time, STATUS_CODES[job.status], job.age, job.required_memory,
+            -1 if start is None else start, _raw_name(job))
+
+
+def _job(make_pcb, row):
+    pid, priority, required_time, status, age, required_memory, start, name = row
+    job = make_pcb(pid, name, priority, required_time, required_memory)
+    # Set again, the constructor turns 0 into a default
+    job.priority = priority
+    job.required_time = required_time
+    job.status = STATUSES[status]
+    job.age = age
+    job.allocated_memory_start = None if start < 0 else start
+    return job
+
+
+def _columns(rows):
+    columns = [array(code) for _, code in COLUMNS]
+    names = []
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+        names.append(row[-1])
+    return {'columns': [column.tobytes() for column in columns], 'names': names}
+
+
+def _rows(payload):
+    columns = []
+    for (_, code), data in zip(COLUMNS, payload['columns']):
+        column = array(code)
+        column.frombytes(data)
+        columns.append(column)
+    return zip(*columns, payload['names'])
+
+
+def _snapshot(engine):
+    """
+    :return: (job kind, dict of PID -> row, pickled engine without jobs)
+    """
+    jobs = {}
+    skeleton = io.BytesIO()
+    state = {'engine': engine, 'random': random.getstate(), 'pid_allocator': pcb.pid_allocator}
+    observers = engine.observers
+    engine.observers = [observer for observer in observers if getattr(observer, 'checkpointed', True)]
+    try:
+        _Pickler(skeleton, jobs).dump(state)
+    except (TypeError, AttributeError, pickle.PicklingError) as e:
+        raise ValueError("Can not checkpoint this engine: {0}".format(e))
+    finally:
+        engine.observers = observers
+    kinds = {JOB_KINDS[type(job)] for job in jobs.values()}
+    if len(kinds) > 1:
+        raise ValueError("Can not checkpoint a mix of {0} jobs".format(", ".join(sorted(kinds))))
+    kind = kinds.pop() if kinds else 'object'
+    return kind, {pid: _row(job) for pid, job in jobs.items()}, skeleton.getvalue()
+
+
+def _restore(kind, rows, skeleton):
+    make_pcb = pcb_factory(kind)
+    jobs = {pid: _job(make_pcb, row) for pid, row in rows.items()}
+    return _Unpickler(io.BytesIO(skeleton), jobs).load()
+
+
+class Checkpointer(object):
+    """
+    Saves checkpoints of one engine, remembering the last one so the next can
+    be a delta on it
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._rows = None  # PID -> row as of last save
+        self._path = None
+        self._digest = None
+
+    def save(self, path, delta=False):
+        """
+        Write a checkpoint
+
+        :param path: file to write
+        :param delta: only write jobs changed since the last save, full if there was none
+        :return: bytes written
+        """
+        kind, rows, skeleton = _snapshot(self.engine)
+        path = os.path.abspath(path)
+        payload = {'kind': kind, 'skeleton': skeleton}
+        if delta and self._rows is not None:
+            previous = self._rows
+            payload.update(_columns(row for pid, row in rows.items() if previous.get(pid) != row))
+            payload['removed'] = array('q', (pid for pid in previous if pid not in rows)).tobytes()
+            base = os.path.relpath(self._path, os.path.dirname(path)).encode('utf-8')
+            header = HEADER.pack(MAGIC, FORMAT_VERSION, DELTA, self._digest, len(base)) + base
+        else:
+            payload.update(_columns(rows.values()))
+            header = HEADER.pack(MAGIC, FORMAT_VERSION, FULL, bytes(32), 0)
+        data = header + zlib.compress(pickle.dumps(payload, pickle.HIGHEST_PROTOCOL), 1)
+
+        # Never leave half a checkpoint behind
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as out:
+            out.write(data)
+        os.replace(temporary, path)
+        self._rows, self._path, self._digest = rows, path, hashlib.sha256(data).digest()
+        return len(data)
+
+
+def save(engine, path):
+    """
+    Write a full checkpoint of engine
+
+    :return: bytes written
+    """
+    return Checkpointer(engine).save(path)
+
+
+def _read(path):
+    """
+    :return: (dict of PID -> row with deltas applied, payload, digest of file)
+    """
+    with open(path, 'rb') as checkpoint:
+        data = checkpoint.read()
+    if len(data) < HEADER.size:
+        raise ValueError("{0} is not a checkpoint".format(path))
+    magic, version, kind, base_digest, base_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("{0} is not a checkpoint".format(path))
+    if version > FORMAT_VERSION:
+        raise ValueError("{0} is format version {1}, this reads up to {2}".format(path, version, FORMAT_VERSION))
+    start = HEADER.size + base_length
+    payload = pickle.loads(zlib.decompress(data[start:]))
+
+    if kind == DELTA:
+        base = os.path.join(os.path.dirname(os.path.abspath(path)), data[HEADER.size:start].decode('utf-8'))
+        rows, _, digest = _read(base)
+        if digest != base_digest:
+            raise ValueError("{0} has changed since delta {1} was written on it".format(base, path))
+        removed = array('q')
+        removed.frombytes(payload['removed'])
+        for pid in removed:
+            del rows[pid]
+    else:
+        rows = {}
+    for row in _rows(payload):
+        rows[row[0]] = row
+    return rows, payload, hashlib.sha256(data).digest()
+
+
+def load(path, restore_globals=True):
+    """
+    Read a checkpoint, following deltas back to their full checkpoint
+
+    :param path: checkpoint file
+    :param restore_globals: also put back the random module's state and pcb.pid_allocator
+    :return: engine as it was saved, ready to run on
+    """
+    rows, payload, _ = _read(path)
+    state = _restore(payload['kind'], rows, payload['skeleton'])
+    if restore_globals:
+        random.setstate(state['random'])
+        pcb.pid_allocator.__dict__.update(state['pid_allocator'].__dict__)
+    return state['engine']
+
+
+def fork(engine):
+    """
+    Copy of engine to run a what-if experiment on, sharing nothing with it
+
+    :return: new engine
+    """
+    return _restore(*_snapshot(engine))['engine']
@@ -0,0 +1,124 @@
+"""
+Simulation clock
+
+VirtualClock keeps simulated time in the unit of PCB.required_time. It never
+ticks by itself: advance_to jumps straight to the time of the next event. With
+a speed it is paced against the wall clock, so a quantum takes
+seconds_per_quantum / speed real seconds; with speed None it runs as fast as
+possible. The speed can be changed from another thread at any time, a wait in
+progress is then stretched or cut short to match.
+"""
+import threading
+import time
+from engine import QUANTUM
+
+SECONDS_PER_QUANTUM = 0.7  # Real seconds a quantum takes at speed 1, as the GUI always showed it
+SPEED_MIN = 0.1
+SPEED_MAX = 1000
+SPEEDS = (0.1, 0.5, 1, 2, 5, 10, 100, 1000, None)  # Choices offered by the GUI, None is as fast as possible
+
+
+class VirtualClock(object):
+    def __init__(self, quantum=QUANTUM, speed=None, seconds_per_quantum=SECONDS_PER_QUANTUM):
+        """
+        :param quantum: time a job runs each dispatch at most
+        :param speed: real time multiplier, SPEED_MIN to SPEED_MAX, None for as fast as possible
+        :param seconds_per_quantum: real seconds a quantum takes at speed 1
+        """
+        self.now = 0
+        self.quantum = quantum
+        self.seconds_per_quantum = seconds_per_quantum
+        self._condition = threading.Condition()
+        self._speed = None
+        self._anchor = (0, time.monotonic())  # (virtual, real) time pacing is measured from
+        self.speed = speed
+
+    def __repr__(self):
+        return "<VirtualClock now:{0} quantum:{1} speed:{2}>".format(self.now, self.quantum, self._speed)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_condition']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._condition = threading.Condition()
+        self._anchor = (self.now, time.monotonic())
+
+    @property
+    def speed(self):
+        return self._speed
+
+    @speed.setter
+    def speed(self, speed):
+        if speed is not None and not SPEED_MIN <= speed <= SPEED_MAX:
+            raise ValueError("Speed {0} out of range, choose from {1} to {2} or None".format(speed, SPEED_MIN,
+                                                                                           SPEED_MAX))
+        with self._condition:
+            # Keep the virtual time reached so far, pace the rest at the new speed
+            real = time.monotonic()
+            self._anchor = (self._virtual_at(real), real)
+            self._speed = speed
+            self._condition.notify_all()
+
+    def _virtual_at(self, real):
+        """
+        :return: virtual time due at real time, never behind now
+        """
+        if self._speed is None:
+            return self.now
+        virtual, since = self._anchor
+        return max(self.now, virtual + (real - since) * self._speed * self.quantum / self.seconds_per_quantum)
+
+    def _real_at(self, at):
+        """
+        :return: real time virtual time at is due
+        """
+        virtual, since = self._anchor
+        return since + (at - virtual) * self.seconds_per_quantum / self.quantum / self._speed
+
+    def time_slice(self, required_time):
+        """
+        :param required_time: time a job still needs
+        :return: how long the job runs this dispatch
+        """
+        return min(self.quantum, required_time)
+
+    def reset(self, now):
+        """
+        Set the clock to now without waiting, e.g. for a run restored from a
+        checkpoint, and pace from there
+
+        :param now: virtual time
+        """
+        with self._condition:
+            self.now = now
+            self._anchor = (now, time.monotonic())
+            self._condition.notify_all()
+
+    def advance_to(self, at):
+        """
+        Jump to virtual time at, first waiting until it is due if paced
+
+        :param at: virtual time of the next event
+        """
+        if at < self.now:
+            raise ValueError("Can not go back from {0} to {1}".format(self.now, at))
+        with self._condition:
+            while self._speed is not None:
+                remaining = self._real_at(at) - time.monotonic()
+                if remaining < -self.seconds_per_quantum / self._speed:
+                    # Fell behind or sat idle, pace from here instead of rushing to catch up
+                    self._anchor = (self.now, time.monotonic())
+                    continue
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            self.now = at
+
+    def advance(self, duration):
+        """
+        Jump duration ahead, see advance_to
+        """
+        self.advance_to(self.now + duration)
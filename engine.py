@@ -0,0 +1,693 @@
+"""
+Headless discrete-event simulation engine
+
+Drives the same job pool / ready pool / memory semantics as the PyQt front end
+in simulation.py, but on a virtual clock with an event queue: no sleeping, no
+threads and no Qt import. Anything that wants to watch a run (a GUI, a tracer,
+a metrics collector) subscribes as an observer.
+"""
+import argparse
+import heapq
+import itertools
+import random
+import time
+from collections import OrderedDict
+from allocators import make_memory
+from pcb import PCB, CompactPCB, PCBTable
+from pqueue import IndexedPriorityQueue
+
+PRIORITY_ADD_EACH_TERN = 0.5  # Add priority each tern
+PRIORITY_MAX = 10  # Limit job's max priority to avoid too big priority
+AGING_TABLE = [0.1, 0.1, 0.2, 0.4, 0.4, 0.5, 1.0, 1.0, 1.5, 1.5, 2.0, 2.5, 3.0, 3.5, 3.8]
+TOTAL_MEM = 122
+MEM_OS_TAKE = 20  # How much memory would operating system take
+QUANTUM = 40  # Required time a job consumes each time it is dispatched
+READY_MAX = 5  # Default max number of jobs in ready pool
+MEMORY_BACKEND = 'first-fit'  # Default allocator, see allocators.MEMORY_BACKENDS
+
+
+def _pid_of(identifier):
+    return identifier.pid if hasattr(identifier, 'pid') else int(identifier)
+
+
+class Pool(object):
+    status = None  # Status given to jobs added to this pool
+
+    def __init__(self):
+        self._pool = OrderedDict()  # PID -> PCB, in order of arrival
+
+    def __len__(self):
+        return len(self._pool)
+
+    def __iter__(self):
+        return iter(self._pool.values())
+
+    def __repr__(self):
+        return "<{0} ({1})>".format(type(self).__name__, len(self._pool))
+
+    def add(self, job):
+        """
+        Add a job to pool
+
+        :param job: Job to add
+        :return: none
+        """
+        self._pool[job.pid] = job
+        if self.status:
+            job.status = self.status
+
+    @property
+    def num(self):
+        """
+        Get number of items in pool
+
+        :return: length of pool
+        """
+        return len(self._pool)
+
+    def item(self, pid):
+        """
+        Get a item for specific PID
+
+        :param pid: PID of item
+        :return: An item of specified PID
+        """
+        return self._pool.get(int(pid))
+
+    def remove(self, identifier):
+        """
+        Remove a job
+
+        :param identifier: job's pid or PCB
+        :return: removed job, or None if it is not in pool
+        """
+        return self._pool.pop(_pid_of(identifier), None)
+
+
+class JobPool(Pool):
+    def pop(self):
+        """
+        Get the first job and remove it from job pool
+        """
+        if self._pool:
+            return self._pool.popitem(last=False)[1]
+
+    def get(self):
+        if self._pool:
+            return next(iter(self._pool.values()))
+
+
+class TerminatedPool(Pool):
+    status = 'terminated'
+
+
+class SuspendPool(Pool):
+    status = 'suspend'
+
+
+class ReadyPool(Pool):
+    status = 'ready'
+
+    def __init__(self, max=READY_MAX, priority_add=PRIORITY_ADD_EACH_TERN, priority_max=PRIORITY_MAX,
+                 aging_table=AGING_TABLE, quantum=QUANTUM):
+        super().__init__()
+        self.max = max
+        self.suspended_count = 0
+        self.priority_add = priority_add
+        self.priority_max = priority_max
+        self.aging_table = aging_table
+        self.quantum = quantum
+
+    def get(self):
+        """
+        Schedule a job for CPU to process
+
+        :return: a job in pool
+        """
+        for item in sorted(self._pool.values(), key=lambda item: item.priority):
+            self._pool.move_to_end(item.pid)
+        return next(iter(self._pool.values()))
+
+    def change_priority(self, job):
+        """
+        Actively adjust job's priority
+
+        :param job: Job running this time
+        :return: none
+        """
+        job.age = 0
+        if job.priority < self.priority_max:
+            job.priority += self.priority_add
+
+        # Change other job's age
+        aging_table = self.aging_table
+        for process in self._pool.values():
+            if process.pid != job.pid:
+                if process.age < len(aging_table) - 1:
+                    process.age += 1
+                if process.priority - aging_table[process.age] >= 0:
+                    process.priority -= aging_table[process.age]
+
+    def time_slice(self, job):
+        """
+        :param job: job about to run
+        :return: how much time job will consume this dispatch
+        """
+        return min(self.quantum, job.required_time)
+
+    def minus_time(self, job):
+        """
+        Minus a job's required_time after it has run for one time slice
+
+        :param job: A job to minus its time
+        :return: time consumed
+        """
+        job.status = 'ready'
+        consumed = self.time_slice(job)
+        job.required_time -= consumed
+        return consumed
+
+    def suspend(self, job):
+        """
+        Suspend a process
+
+        :param job: job to suspend
+        :return: none
+        """
+        self.remove(job)
+        self.suspended_count += 1
+
+    def resume(self, job):
+        """
+        Resume a suspended job
+
+        :param job: job to resume
+        :return: none
+        """
+        self.add(job)
+        self.suspended_count -= 1
+
+    def migrate_out(self, job):
+        """
+        Remove a job that moves to another ready pool
+
+        :param job: job in this pool
+        :return: what the policy keeps about job, for migrate_in of the pool it goes to
+        """
+        self.remove(job)
+        return None
+
+    def migrate_in(self, job, state):
+        """
+        Add a job coming from another ready pool of the same policy
+
+        :param job: job to add
+        :param state: what migrate_out of the pool it left returned
+        """
+        self.add(job)
+
+    @property
+    def count(self):
+        """
+        :return: number of jobs that could be scheduled
+        """
+        return self.max - self.suspended_count
+
+
+class HeapReadyPool(ReadyPool):
+    """
+    Ready pool kept in an indexed heap keyed on (priority, arrival order), so
+    insert, dispatch and a priority change each cost O(log n) instead of a
+    full sort per dispatch. Equal priorities are served first come first served.
+
+    ReadyPool breaks ties differently: its stable sort keeps equal jobs in the
+    order the previous dispatch's sort left them, which depends on every
+    priority the jobs had before. Following that would mean re-keying every
+    job on every dispatch, so the two serve equal priorities in different
+    orders and a run soon dispatches differently; this is a policy of its
+    own, not a drop-in replacement.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = IndexedPriorityQueue()
+        self._sequence = itertools.count()
+
+    def __iter__(self):
+        return iter(self._pool)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_sequence'] = next(self._sequence)  # itertools.count is not picklable on every Python
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._sequence = itertools.count(state['_sequence'])
+
+    def key(self, job):
+        """
+        :param job: job to queue
+        :return: value job is ordered by, smallest runs first
+        """
+        return job.priority
+
+    def add(self, job):
+        self._pool.push(job.pid, (self.key(job), next(self._sequence)), job)
+        job.status = self.status
+
+    def item(self, pid):
+        return self._pool.get(int(pid))
+
+    def remove(self, identifier):
+        return self._pool.remove(_pid_of(identifier))
+
+    def get(self):
+        return self._pool.peek()
+
+    def set_priority(self, job, priority):
+        """
+        Change a queued job's priority and restore heap order
+
+        :param job: job in this pool
+        :param priority: new priority
+        """
+        job.priority = priority
+        self._pool.update(job.pid, (priority, self._pool.key(job.pid)[1]))
+
+    def change_priority(self, job):
+        job.age = 0
+        if job.priority < self.priority_max:
+            self.set_priority(job, job.priority + self.priority_add)
+
+        aging_table = self.aging_table
+        for process in list(self._pool):
+            if process.pid != job.pid:
+                if process.age < len(aging_table) - 1:
+                    process.age += 1
+                if process.priority - aging_table[process.age] >= 0:
+                    self.set_priority(process, process.priority - aging_table[process.age])
+
+
+class LazyAgingReadyPool(HeapReadyPool):
+    """
+    Ready pool that ages waiting jobs lazily, so a dispatch costs O(log n)
+    whatever the number of waiting jobs.
+
+    Every waiting job loses aging_rate priority per dispatch, which keeps their
+    relative order fixed. The pool only counts dispatches (the epoch) and
+    stores each job under priority + aging_rate * epoch it entered at; the
+    effective priority is worked out when it is asked for and written back to
+    the PCB when the job runs or leaves the pool. This is a linear
+    approximation of AGING_TABLE, which ages a job faster the longer it waits.
+    """
+
+    def __init__(self, *args, aging_rate=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.aging_rate = aging_rate if aging_rate is not None else sum(self.aging_table) / len(self.aging_table)
+        self.epoch = 0
+        self._entered = {}  # pid -> epoch job entered pool or last ran at
+
+    def add(self, job):
+        self._entered[job.pid] = self.epoch
+        self._pool.push(job.pid, (job.priority + self.aging_rate * self.epoch, next(self._sequence)), job)
+        job.status = self.status
+
+    def remove(self, identifier):
+        job = self._pool.get(_pid_of(identifier))
+        if job is not None:
+            self._materialize(job)
+            self._pool.remove(job.pid)
+            del self._entered[job.pid]
+        return job
+
+    def priority_of(self, job):
+        """
+        :param job: job in this pool
+        :return: job's priority as of now
+        """
+        return max(0.0, self._pool.key(job.pid)[0] - self.aging_rate * self.epoch)
+
+    def age_of(self, job):
+        """
+        :param job: job in this pool
+        :return: job's age as of now
+        """
+        return min(self.epoch - self._entered[job.pid], len(self.aging_table) - 1)
+
+    def _materialize(self, job):
+        job.priority = self.priority_of(job)
+        job.age = self.age_of(job)
+
+    def set_priority(self, job, priority):
+        job.priority = priority
+        self._entered[job.pid] = self.epoch
+        self._pool.update(job.pid, (priority + self.aging_rate * self.epoch, self._pool.key(job.pid)[1]))
+
+    def change_priority(self, job):
+        priority = self.priority_of(job)
+        self.epoch += 1  # Everyone but job ages one step
+        job.age = 0
+        if priority < self.priority_max:
+            priority += self.priority_add
+        self.set_priority(job, priority)
+
+
+class Engine(object):
+    """
+    Discrete-event scheduler simulation
+
+    The clock (``now``) is measured in the same unit as ``PCB.required_time``
+    and only ever jumps from one event to the next. Observers are callables
+    ``observer(event, now, job)``; events are ``arrive``, ``admit``,
+    ``dispatch``, ``preempt``, ``terminate``, ``suspend`` and ``resume``.
+    Given a clock.VirtualClock, a run is paced by it against the wall clock.
+    """
+
+    def __init__(self, ready_pool=None, memory=None, mem_os_take=MEM_OS_TAKE, clock=None):
+        self.now = 0
+        self.clock = clock
+        self.ticks = 0  # Number of dispatches so far
+        self.running = None
+        self.observers = []
+        self.job_pool = JobPool()
+        self.ready_pool = ready_pool if ready_pool is not None else ReadyPool()
+        self.suspend_pool = SuspendPool()
+        self.terminated_pool = TerminatedPool()
+        self.memory = memory if memory is not None else make_memory(MEMORY_BACKEND, TOTAL_MEM)
+        self._events = []
+        self._sequence = itertools.count()
+        self._dispatch_pending = False
+        self._admission_blocked = False  # No waiting job fits, and no memory was freed nor job arrived since
+        self._unfit = None  # Smallest required_memory that did not fit since memory was last freed
+        self._waiting_memory = {}  # required_memory -> number of jobs in job pool needing it
+
+        if mem_os_take:
+            self.memory.allocate(mem_os_take)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_sequence'] = next(self._sequence)  # itertools.count is not picklable on every Python
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._sequence = itertools.count(state['_sequence'])
+
+    def subscribe(self, observer):
+        """
+        Register a callable to be told about every event
+
+        :param observer: callable taking (event, now, job)
+        """
+        self.observers.append(observer)
+
+    def _emit(self, event, job):
+        for observer in self.observers:
+            observer(event, self.now, job)
+
+    def schedule(self, at, callback, *args):
+        """
+        Put a callback on the event queue
+
+        :param at: virtual time to fire at
+        :param callback: function to call
+        """
+        heapq.heappush(self._events, (at, next(self._sequence), callback, args))
+
+    def submit(self, job, at=None):
+        """
+        Make a job arrive at job pool
+
+        :param job: job to submit
+        :param at: arrival time, now by default
+        """
+        self.schedule(self.now if at is None else max(at, self.now), self._arrive, job)
+
+    def suspend(self, pid):
+        """
+        Suspend a waiting job, like clicking it in the ready table
+
+        :return: suspended job, or None if it can not be suspended
+        """
+        job = self.ready_pool.item(pid)
+        if job is None or job.status != 'ready':
+            return None
+        self.ready_pool.suspend(job)
+        self.suspend_pool.add(job)
+        self._emit('suspend', job)
+        return job
+
+    def resume(self, pid):
+        """
+        Resume a suspended job
+
+        :return: resumed job, or None if it is not suspended
+        """
+        job = self.suspend_pool.remove(pid)
+        if job is None:
+            return None
+        self.ready_pool.resume(job)
+        self._emit('resume', job)
+        self._wake()
+        return job
+
+    def long_term_schedule(self):
+        """
+        Move jobs from job pool to ready pool while there is room. Every
+        waiting job is tried once a pass; one that does not fit in memory goes
+        to the back of job pool, like the GUI's long term scheduler does.
+
+        A job no smaller than one that already failed can not fit either, so
+        it is passed over without asking memory, and the pass ends once no
+        waiting job is smaller. When none fits, job pool is not tried again
+        until memory is freed or a job arrives.
+        """
+        if self._admission_blocked:
+            return
+        job_pool, waiting = self.job_pool, self._waiting_memory
+        smallest = min(waiting, default=0)
+        for _ in range(job_pool.num):
+            target = self._room()
+            if target is None:
+                return
+            unfit = self._unfit
+            if unfit is not None and unfit <= smallest:
+                break
+            job = job_pool.pop()
+            need = job.required_memory
+            mem = "Failure" if unfit is not None and need >= unfit else self.memory.allocate(need)
+            if mem == "Failure":
+                job_pool.add(job)
+                self._unfit = need if unfit is None else min(unfit, need)
+                continue
+            if waiting[need] == 1:
+                del waiting[need]
+            else:
+                waiting[need] -= 1
+            job.allocated_memory_start = mem
+            self._place(job, target)
+            self._emit('admit', job)
+        self._admission_blocked = job_pool.num > 0
+
+    def _room(self):
+        """
+        :return: ready pool the next admitted job goes to, None while there is no room
+        """
+        ready_pool = self.ready_pool
+        return ready_pool if ready_pool.num < ready_pool.count else None
+
+    def _place(self, job, ready_pool):
+        ready_pool.add(job)
+
+    def _freed(self, job):
+        """
+        Give a leaving job's memory back, so waiting jobs are tried again
+        """
+        self.memory.free(job.required_memory, job.allocated_memory_start)
+        self._admission_blocked = False
+        self._unfit = None
+
+    def run(self, until=None):
+        """
+        Process events until the queue is empty or the clock passes until
+
+        :param until: virtual time to stop at, None to run to completion
+        :return: virtual time when stopped
+        """
+        events = self._events
+        clock = self.clock
+        while events:
+            if until is not None and events[0][0] > until:
+                if clock is not None:
+                    clock.advance_to(until)
+                self.now = until
+                break
+            at, _, callback, args = heapq.heappop(events)
+            if clock is not None:
+                clock.advance_to(at)
+            self.now = at
+            callback(*args)
+        return self.now
+
+    def _arrive(self, job):
+        self.job_pool.add(job)
+        need = job.required_memory
+        self._waiting_memory[need] = self._waiting_memory.get(need, 0) + 1
+        self._admission_blocked = False
+        self._emit('arrive', job)
+        self._wake()
+
+    def _wake(self):
+        if self.running is None and not self._dispatch_pending:
+            self._dispatch_pending = True
+            self.schedule(self.now, self._dispatch)
+
+    def _dispatch(self):
+        self._dispatch_pending = False
+        self.long_term_schedule()
+        if self.ready_pool.num == 0:
+            return
+
+        job = self.ready_pool.get()
+        job.status = 'running'
+        self.running = job
+        self.ticks += 1
+        self.ready_pool.change_priority(job)
+        self._emit('dispatch', job)
+        self.schedule(self.now + self.ready_pool.time_slice(job), self._complete, job)
+
+    def _complete(self, job):
+        self.running = None
+        self.ready_pool.minus_time(job)
+        if job.required_time == 0:
+            self.ready_pool.remove(job)
+            self._freed(job)
+            self.terminated_pool.add(job)
+            self._emit('terminate', job)
+        else:
+            self._emit('preempt', job)
+        self._wake()
+
+
+def random_job(pid, make_pcb=PCB):
+    """
+    Random job with the same distribution as PCB.random, without touching the
+    shared PID allocator
+
+    :param pid: PID to give the job
+    :param make_pcb: PCB, CompactPCB or a PCBTable's new
+    :return: a random job object, named from its PID when asked
+    """
+    return make_pcb(pid, None, random.randint(1, 7), random.randint(200, 1000))
+
+
+def pcb_factory(kind):
+    """
+    :param kind: 'object' for PCB, 'compact' for CompactPCB or 'table' for rows of a PCBTable
+    :return: callable making jobs like PCB does
+    """
+    if kind == 'object':
+        return PCB
+    elif kind == 'compact':
+        return CompactPCB
+    elif kind == 'table':
+        return PCBTable().new
+    raise ValueError("Unknown PCB kind {0!r}, choose from compact, object, table".format(kind))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a headless scheduling simulation")
+    parser.add_argument("jobs", type=int, nargs='?', default=1000, help="number of random jobs")
+    parser.add_argument("--trace", default=None, help="replay jobs from a CSV or JSONL trace instead")
+    parser.add_argument("--high-water", type=int, default=None, help="max jobs read ahead into job pool from trace")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--mode", default='priority', help="scheduling policy, see policies.POLICIES")
+    parser.add_argument("--quantum", type=int, default=QUANTUM, help="time a job runs each dispatch at most")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="pace the run at this multiple of the GUI's speed, 0.1 to 1000, as fast as possible by default")
+    parser.add_argument("--memory", default=MEMORY_BACKEND, help="allocator, see allocators.MEMORY_BACKENDS")
+    parser.add_argument("--total-mem", type=int, default=TOTAL_MEM, help="memory units")
+    parser.add_argument("--pcb", default='object', choices=['object', 'compact', 'table'],
+                        help="job representation, compact and table save memory on big runs")
+    parser.add_argument("--metrics", action='store_true', help="print scheduling metrics as JSON at the end")
+    parser.add_argument("--cores", type=int, default=1, help="number of simulated CPUs")
+    parser.add_argument("--migration-cost", type=int, default=0, help="time lost by a job moving to another CPU")
+    parser.add_argument("--balance-interval", type=int, default=None, help="time between load balancing passes")
+    parser.add_argument("--event-trace", default=None, help="record events to a binary trace, see tracing.py")
+    parser.add_argument("--restore", default=None, help="carry on the run saved in a checkpoint instead")
+    parser.add_argument("--checkpoint", default=None, help="save a checkpoint here when the run ends")
+    parser.add_argument("--checkpoint-every", type=int, default=None,
+                        help="save a checkpoint every so much virtual time instead")
+    parser.add_argument("--delta", action='store_true',
+                        help="save checkpoints after the first as deltas, to CHECKPOINT.1, CHECKPOINT.2 and so on")
+    args = parser.parse_args()
+    if args.checkpoint_every and not args.checkpoint:
+        parser.error("--checkpoint-every needs --checkpoint")
+    if args.trace and args.checkpoint:
+        parser.error("--trace can not be checkpointed, the replay holds the trace file open")
+
+    # Classes from the importable module, not __main__, so checkpoints load anywhere
+    from engine import Engine, random_job, pcb_factory
+    from policies import make_ready_pool
+    random.seed(args.seed)
+    clock = None
+    if args.speed is not None:
+        from clock import VirtualClock
+        clock = VirtualClock(quantum=args.quantum, speed=args.speed)
+    if args.restore:
+        from checkpoint import load
+        engine = load(args.restore)
+        engine.clock = clock
+        if clock is not None:
+            clock.reset(engine.now)
+    elif args.cores > 1:
+        from multicore import MultiCoreEngine
+        engine = MultiCoreEngine(cores=args.cores,
+                                 make_ready_pool=lambda: make_ready_pool(args.mode, quantum=args.quantum),
+                                 memory=make_memory(args.memory, args.total_mem),
+                                 migration_cost=args.migration_cost, balance_interval=args.balance_interval,
+                                 clock=clock)
+    else:
+        engine = Engine(ready_pool=make_ready_pool(args.mode, quantum=args.quantum),
+                        memory=make_memory(args.memory, args.total_mem), clock=clock)
+    make_pcb = pcb_factory(args.pcb)
+    if args.metrics:
+        from metrics import MetricsCollector
+        collector = next((observer for observer in engine.observers if isinstance(observer, MetricsCollector)),
+                         None) or MetricsCollector(engine)
+    if args.event_trace:
+        from tracing import EventTracer
+        tracer = EventTracer(engine, args.event_trace)
+    if args.restore:
+        pass  # Jobs came with the checkpoint
+    elif args.trace:
+        from traces import read_trace, TraceReplay, HIGH_WATER
+        TraceReplay(engine, read_trace(args.trace), high_water=args.high_water or HIGH_WATER,
+                    make_pcb=make_pcb).start()
+    else:
+        for pid in range(1, args.jobs + 1):
+            engine.submit(random_job(pid, make_pcb))
+
+    started = time.perf_counter()
+    if args.checkpoint:
+        from checkpoint import Checkpointer
+        checkpointer = Checkpointer(engine)
+        saves = 0
+        while True:
+            engine.run(until=engine.now + args.checkpoint_every if args.checkpoint_every else None)
+            path = "{0}.{1}".format(args.checkpoint, saves) if args.delta and saves else args.checkpoint
+            checkpointer.save(path, delta=args.delta)
+            saves += 1
+            if not engine._events:
+                break
+    else:
+        engine.run()
+    elapsed = time.perf_counter() - started
+    if args.event_trace:
+        tracer.close()
+    print("{0} jobs terminated, {1} dispatches, virtual time {2}, {3:.2f}s wall ({4:.0f} dispatches/s)".format(
+        engine.terminated_pool.num, engine.ticks, engine.now, elapsed, engine.ticks / elapsed if elapsed else 0))
+    if args.metrics:
+        import json
+        print(json.dumps(collector.summary(), indent=2))
@@ -20,81 +20,31 @@ class Ui_MainWindow(object):
         self.JobPoolLabel = QtWidgets.QLabel(self.centralwidget)
         self.JobPoolLabel.setGeometry(QtCore.QRect(20, 20, 60, 16))
         self.JobPoolLabel.setObjectName("JobPoolLabel")
-        self.JobPoolTable = QtWidgets.QTableWidget(self.centralwidget)
+        self.JobPoolTable = QtWidgets.QTableView(self.centralwidget)
         self.JobPoolTable.setGeometry(QtCore.QRect(10, 40, 831, 181))
         self.JobPoolTable.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
         self.JobPoolTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.JobPoolTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         self.JobPoolTable.setObjectName("JobPoolTable")
-        self.JobPoolTable.setColumnCount(6)
-        self.JobPoolTable.setRowCount(0)
-        item = QtWidgets.QTableWidgetItem()
-        self.JobPoolTable.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.JobPoolTable.setHorizontalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.JobPoolTable.setHorizontalHeaderItem(2, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.JobPoolTable.setHorizontalHeaderItem(3, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.JobPoolTable.setHorizontalHeaderItem(4, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.JobPoolTable.setHorizontalHeaderItem(5, item)
         self.JobPoolTable.horizontalHeader().setVisible(True)
         self.JobPoolTable.horizontalHeader().setHighlightSections(True)
         self.JobPoolTable.verticalHeader().setVisible(False)
-        self.ReadyTable = QtWidgets.QTableWidget(self.centralwidget)
+        self.ReadyTable = QtWidgets.QTableView(self.centralwidget)
         self.ReadyTable.setGeometry(QtCore.QRect(10, 250, 831, 181))
         self.ReadyTable.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAsNeeded)
         self.ReadyTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.ReadyTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         self.ReadyTable.setObjectName("ReadyTable")
-        self.ReadyTable.setColumnCount(8)
-        self.ReadyTable.setRowCount(0)
-        item = QtWidgets.QTableWidgetItem()
-        self.ReadyTable.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.ReadyTable.setHorizontalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.ReadyTable.setHorizontalHeaderItem(2, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.ReadyTable.setHorizontalHeaderItem(3, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.ReadyTable.setHorizontalHeaderItem(4, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.ReadyTable.setHorizontalHeaderItem(5, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.ReadyTable.setHorizontalHeaderItem(6, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.ReadyTable.setHorizontalHeaderItem(7, item)
         self.ReadyTable.verticalHeader().setVisible(False)
         self.RunningLabel = QtWidgets.QLabel(self.centralwidget)
         self.RunningLabel.setGeometry(QtCore.QRect(20, 230, 60, 16))
         self.RunningLabel.setObjectName("RunningLabel")
-        self.SuspendTable = QtWidgets.QTableWidget(self.centralwidget)
+        self.SuspendTable = QtWidgets.QTableView(self.centralwidget)
         self.SuspendTable.setGeometry(QtCore.QRect(10, 460, 831, 121))
         self.SuspendTable.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAsNeeded)
         self.SuspendTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.SuspendTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         self.SuspendTable.setObjectName("SuspendTable")
-        self.SuspendTable.setColumnCount(8)
-        self.SuspendTable.setRowCount(0)
-        item = QtWidgets.QTableWidgetItem()
-        self.SuspendTable.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.SuspendTable.setHorizontalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.SuspendTable.setHorizontalHeaderItem(2, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.SuspendTable.setHorizontalHeaderItem(3, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.SuspendTable.setHorizontalHeaderItem(4, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.SuspendTable.setHorizontalHeaderItem(5, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.SuspendTable.setHorizontalHeaderItem(6, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.SuspendTable.setHorizontalHeaderItem(7, item)
         self.SuspendTable.verticalHeader().setVisible(False)
         self.SuspendLabel = QtWidgets.QLabel(self.centralwidget)
         self.SuspendLabel.setGeometry(QtCore.QRect(20, 440, 141, 16))
@@ -144,17 +94,11 @@ class Ui_MainWindow(object):
         self.FinishedGroupBox = QtWidgets.QGroupBox(self.centralwidget)
         self.FinishedGroupBox.setGeometry(QtCore.QRect(850, 180, 241, 441))
         self.FinishedGroupBox.setObjectName("FinishedGroupBox")
-        self.TerminatedTable = QtWidgets.QTableWidget(self.FinishedGroupBox)
+        self.TerminatedTable = QtWidgets.QTableView(self.FinishedGroupBox)
         self.TerminatedTable.setGeometry(QtCore.QRect(10, 30, 221, 401))
         self.TerminatedTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.TerminatedTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         self.TerminatedTable.setObjectName("TerminatedTable")
-        self.TerminatedTable.setColumnCount(2)
-        self.TerminatedTable.setRowCount(0)
-        item = QtWidgets.QTableWidgetItem()
-        self.TerminatedTable.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.TerminatedTable.setHorizontalHeaderItem(1, item)
         self.TerminatedTable.verticalHeader().setVisible(False)
         self.layoutWidget3 = QtWidgets.QWidget(self.centralwidget)
         self.layoutWidget3.setGeometry(QtCore.QRect(480, 590, 361, 36))
@@ -197,17 +141,30 @@ class Ui_MainWindow(object):
         self.NowRunningLabel.setGeometry(QtCore.QRect(10, 600, 141, 16))
         self.NowRunningLabel.setText("")
         self.NowRunningLabel.setObjectName("NowRunningLabel")
-        self.rightBarWidget = QtWidgets.QTableWidget(self.centralwidget)
+        self.layoutWidget5 = QtWidgets.QWidget(self.centralwidget)
+        self.layoutWidget5.setGeometry(QtCore.QRect(160, 590, 311, 36))
+        self.layoutWidget5.setObjectName("layoutWidget5")
+        self.ClockLayout = QtWidgets.QHBoxLayout(self.layoutWidget5)
+        self.ClockLayout.setContentsMargins(0, 0, 0, 0)
+        self.ClockLayout.setObjectName("ClockLayout")
+        self.SpeedLabel = QtWidgets.QLabel(self.layoutWidget5)
+        self.SpeedLabel.setObjectName("SpeedLabel")
+        self.ClockLayout.addWidget(self.SpeedLabel)
+        self.SpeedBox = QtWidgets.QComboBox(self.layoutWidget5)
+        self.SpeedBox.setObjectName("SpeedBox")
+        self.ClockLayout.addWidget(self.SpeedBox)
+        self.QuantumLabel = QtWidgets.QLabel(self.layoutWidget5)
+        self.QuantumLabel.setObjectName("QuantumLabel")
+        self.ClockLayout.addWidget(self.QuantumLabel)
+        self.QuantumBox = QtWidgets.QSpinBox(self.layoutWidget5)
+        self.QuantumBox.setMinimum(1)
+        self.QuantumBox.setMaximum(1000)
+        self.QuantumBox.setProperty("value", 40)
+        self.QuantumBox.setObjectName("QuantumBox")
+        self.ClockLayout.addWidget(self.QuantumBox)
+        self.rightBarWidget = MemoryMapWidget(self.centralwidget)
         self.rightBarWidget.setGeometry(QtCore.QRect(1100, 10, 71, 611))
-        self.rightBarWidget.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
-        self.rightBarWidget.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
         self.rightBarWidget.setObjectName("rightBarWidget")
-        self.rightBarWidget.setColumnCount(1)
-        self.rightBarWidget.setRowCount(0)
-        item = QtWidgets.QTableWidgetItem()
-        self.rightBarWidget.setHorizontalHeaderItem(0, item)
-        self.rightBarWidget.horizontalHeader().setVisible(False)
-        self.rightBarWidget.verticalHeader().setVisible(False)
         MainWindow.setCentralWidget(self.centralwidget)
         self.menubar = QtWidgets.QMenuBar(MainWindow)
         self.menubar.setGeometry(QtCore.QRect(0, 0, 1178, 22))
@@ -224,51 +181,7 @@ class Ui_MainWindow(object):
         _translate = QtCore.QCoreApplication.translate
         MainWindow.setWindowTitle(_translate("MainWindow", "调度演示 by Frederic"))
         self.JobPoolLabel.setText(_translate("MainWindow", "Job Pool"))
-        item = self.JobPoolTable.horizontalHeaderItem(0)
-        item.setText(_translate("MainWindow", "PID"))
-        item = self.JobPoolTable.horizontalHeaderItem(1)
-        item.setText(_translate("MainWindow", "作业名称"))
-        item = self.JobPoolTable.horizontalHeaderItem(2)
-        item.setText(_translate("MainWindow", "状态"))
-        item = self.JobPoolTable.horizontalHeaderItem(3)
-        item.setText(_translate("MainWindow", "优先权"))
-        item = self.JobPoolTable.horizontalHeaderItem(4)
-        item.setText(_translate("MainWindow", "要求运行时间"))
-        item = self.JobPoolTable.horizontalHeaderItem(5)
-        item.setText(_translate("MainWindow", "所需内存"))
-        item = self.ReadyTable.horizontalHeaderItem(0)
-        item.setText(_translate("MainWindow", "PID"))
-        item = self.ReadyTable.horizontalHeaderItem(1)
-        item.setText(_translate("MainWindow", "作业名称"))
-        item = self.ReadyTable.horizontalHeaderItem(2)
-        item.setText(_translate("MainWindow", "状态"))
-        item = self.ReadyTable.horizontalHeaderItem(3)
-        item.setText(_translate("MainWindow", "优先权"))
-        item = self.ReadyTable.horizontalHeaderItem(4)
-        item.setText(_translate("MainWindow", "要求运行时间"))
-        item = self.ReadyTable.horizontalHeaderItem(5)
-        item.setText(_translate("MainWindow", "PCB指针"))
-        item = self.ReadyTable.horizontalHeaderItem(6)
-        item.setText(_translate("MainWindow", "所需内存"))
-        item = self.ReadyTable.horizontalHeaderItem(7)
-        item.setText(_translate("MainWindow", "内存首地址"))
         self.RunningLabel.setText(_translate("MainWindow", "Ready"))
-        item = self.SuspendTable.horizontalHeaderItem(0)
-        item.setText(_translate("MainWindow", "PID"))
-        item = self.SuspendTable.horizontalHeaderItem(1)
-        item.setText(_translate("MainWindow", "作业名称"))
-        item = self.SuspendTable.horizontalHeaderItem(2)
-        item.setText(_translate("MainWindow", "状态"))
-        item = self.SuspendTable.horizontalHeaderItem(3)
-        item.setText(_translate("MainWindow", "优先权"))
-        item = self.SuspendTable.horizontalHeaderItem(4)
-        item.setText(_translate("MainWindow", "要求运行时间"))
-        item = self.SuspendTable.horizontalHeaderItem(5)
-        item.setText(_translate("MainWindow", "PCB指针"))
-        item = self.SuspendTable.horizontalHeaderItem(6)
-        item.setText(_translate("MainWindow", "所需内存"))
-        item = self.SuspendTable.horizontalHeaderItem(7)
-        item.setText(_translate("MainWindow", "内存首地址"))
         self.SuspendLabel.setText(_translate("MainWindow", "Suspended"))
         self.AddJobGroupBox.setTitle(_translate("MainWindow", "添加任务"))
         self.AddJobButton.setText(_translate("MainWindow", "添加任务"))
@@ -276,14 +189,11 @@ class Ui_MainWindow(object):
         self.AddJobPriorityLabel.setText(_translate("MainWindow", "优先权值"))
         self.AddJobTimeLabel.setText(_translate("MainWindow", "运行时间"))
         self.FinishedGroupBox.setTitle(_translate("MainWindow", "已完成"))
-        item = self.TerminatedTable.horizontalHeaderItem(0)
-        item.setText(_translate("MainWindow", "PID"))
-        item = self.TerminatedTable.horizontalHeaderItem(1)
-        item.setText(_translate("MainWindow", "作业名称"))
         self.PriorityRadio.setText(_translate("MainWindow", "动态优先级+时间片调度"))
         self.DaoshuLabel.setText(_translate("MainWindow", "道数"))
         self.StartButton.setText(_translate("MainWindow", "开始运行"))
         self.GenerateJobButton.setText(_translate("MainWindow", "随机生成任务"))
-        item = self.rightBarWidget.horizontalHeaderItem(0)
-        item.setText(_translate("MainWindow", "column1"))
+        self.SpeedLabel.setText(_translate("MainWindow", "速度"))
+        self.QuantumLabel.setText(_translate("MainWindow", "时间片"))
 
+from memory_map import MemoryMapWidget
@@ -0,0 +1,76 @@
+"""
+Memory map widget
+
+Paints a memory as a vertical bar, free extents in one colour and allocated
+ones in another, straight from the allocator's list of holes. An extent
+smaller than a pixel is not drawn on its own: all of them falling in the same
+pixel row are summed up and the row is shaded by how much of it is free. So a
+repaint costs O(extents) however many units the memory has.
+"""
+from PyQt5 import QtGui, QtWidgets
+
+COLOR_MEMORY = QtGui.QColor(12, 249, 20)
+COLOR_USED_MEMORY = QtGui.QColor(255, 152, 0)
+
+
+def _mix(free_fraction):
+    """
+    :param free_fraction: share of a pixel row that is free, 0 to 1
+    :return: colour between COLOR_USED_MEMORY and COLOR_MEMORY
+    """
+    used_fraction = 1 - free_fraction
+    return QtGui.QColor(round(COLOR_MEMORY.red() * free_fraction + COLOR_USED_MEMORY.red() * used_fraction),
+                        round(COLOR_MEMORY.green() * free_fraction + COLOR_USED_MEMORY.green() * used_fraction),
+                        round(COLOR_MEMORY.blue() * free_fraction + COLOR_USED_MEMORY.blue() * used_fraction))
+
+
+class MemoryMapWidget(QtWidgets.QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.memory = None
+
+    def setMemory(self, memory):
+        """
+        Show a memory
+
+        :param memory: object with total and free_extents(), like allocators' memories
+        """
+        self.memory = memory
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        rect = self.contentsRect()
+        if self.memory is None or not self.memory.total or rect.height() <= 0:
+            painter.fillRect(rect, COLOR_MEMORY)
+            return
+        painter.fillRect(rect, COLOR_USED_MEMORY)
+
+        left, top, width = rect.x(), rect.y(), rect.width()
+        scale = rect.height() / self.memory.total  # Pixels per unit
+        dirty_top, dirty_bottom = event.rect().top() - top, event.rect().bottom() - top + 1
+
+        row, row_free = None, 0.0  # Pixel row being summed up and its free pixels
+        for start, length in self.memory.free_extents():
+            y0, y1 = start * scale, (start + length) * scale
+            if y1 <= dirty_top:
+                continue
+            if y0 >= dirty_bottom:
+                break
+            first_row, last_row = int(y0), int(y1)
+            # Part of extent in first pixel row
+            if first_row != row:
+                if row is not None:
+                    painter.fillRect(left, top + row, width, 1, _mix(min(1.0, row_free)))
+                row, row_free = first_row, 0.0
+            if first_row == last_row:
+                row_free += y1 - y0
+                continue
+            row_free += first_row + 1 - y0
+            painter.fillRect(left, top + row, width, 1, _mix(min(1.0, row_free)))
+            # Whole pixel rows, then start summing up the last one
+            if last_row > first_row + 1:
+                painter.fillRect(left, top + first_row + 1, width, last_row - first_row - 1, COLOR_MEMORY)
+            row, row_free = last_row, y1 - last_row
+        if row is not None and row_free > 0:
+            painter.fillRect(left, top + row, width, 1, _mix(min(1.0, row_free)))
@@ -0,0 +1,221 @@
+"""
+Scheduling metrics
+
+MetricsCollector subscribes to an engine.Engine and times every job state
+change (new, ready, running, suspend, terminated). Per-job times go into
+histograms as each job terminates and are then dropped, so memory depends on
+how many jobs are in the system, not on how long the run is.
+"""
+
+# Engine event -> state job is in afterwards
+STATES = {
+    'arrive': 'new',
+    'admit': 'ready',
+    'dispatch': 'running',
+    'preempt': 'ready',
+    'suspend': 'suspend',
+    'resume': 'ready',
+    'terminate': 'terminated',
+}
+
+
+class LogHistogram(object):
+    """
+    HDR-style histogram of non-negative numbers
+
+    Values under 2 ** precision get a bucket each; above that, every power of
+    two is split into 2 ** precision buckets, so a quantile is off by at most
+    1 / 2 ** precision of its value. Buckets are kept sparse, and two
+    histograms of the same precision merge by adding bucket counts.
+    """
+
+    def __init__(self, precision=7):
+        self.precision = precision
+        self.buckets = {}  # bucket -> count
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        shift = value.bit_length() - self.precision - 1
+        if shift <= 0:
+            return value
+        return ((shift + 1) << self.precision) + (value >> shift) - (1 << self.precision)
+
+    def _lowest(self, bucket):
+        """
+        :return: smallest value falling in bucket
+        """
+        shift = (bucket >> self.precision) - 1
+        if shift <= 0:
+            return bucket
+        return (bucket - (shift << self.precision)) << shift
+
+    def add(self, value, count=1):
+        """
+        Record a value
+
+        :param value: number, rounded down to an int
+        :param count: times to record it
+        """
+        value = int(value)
+        bucket = self._bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Add another histogram's values to this one
+
+        :param other: LogHistogram of the same precision
+        """
+        if other.precision != self.precision:
+            raise ValueError("Can not merge histograms of precision {0} and {1}".format(self.precision,
+                                                                                       other.precision))
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """
+        :param q: 0 to 1, e.g. 0.99
+        :return: value q of the values are at or below, None if empty
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(max(self._lowest(bucket), self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        :return: dict of count, mean, min, p50, p90, p99 and max
+        """
+        return {'count': self.count, 'mean': self.mean, 'min': self.min, 'p50': self.quantile(0.5),
+                'p90': self.quantile(0.9), 'p99': self.quantile(0.99), 'max': self.max}
+
+
+class MetricsCollector(object):
+    """
+    Engine observer collecting per-job and system-wide metrics
+
+    Per job: turnaround (arrival to termination), waiting (time spent ready),
+    response (arrival to first dispatch) and time spent suspended. System:
+    CPU utilisation (averaged over cores of a multicore engine), throughput,
+    time-weighted and peak memory in use, and counts of state changes.
+    """
+
+    def __init__(self, engine, precision=7, sink=None):
+        """
+        :param engine: engine.Engine to watch
+        :param precision: precision of histograms, see LogHistogram
+        :param sink: optional callable given (pid, dict of the job's metrics) when a job terminates
+        """
+        self.engine = engine
+        self.sink = sink
+        self.turnaround = LogHistogram(precision)
+        self.waiting = LogHistogram(precision)
+        self.response = LogHistogram(precision)
+        self.suspended = LogHistogram(precision)
+        self.transitions = dict.fromkeys(STATES.values(), 0)
+        self.start = engine.now
+        self.cpus = len(getattr(engine, 'cores', ())) or 1
+        self.busy = 0  # CPU time spent running jobs, over all CPUs
+        self.memory_total = engine.memory.total
+        self.memory_used = self.memory_total - sum(length for _, length in engine.memory.free_extents())
+        self.memory_peak = self.memory_used
+        self._memory_area = 0  # Integral of memory in use over time
+        self._memory_since = engine.now
+        self._jobs = {}  # pid -> [arrival, first dispatch, state since, waiting, suspended]
+        self._running_since = {}  # pid -> time job was dispatched, for jobs running now
+        engine.subscribe(self)
+
+    def __call__(self, event, now, job):
+        state = STATES.get(event)
+        if state is None:
+            return
+        self.transitions[state] += 1
+        if event == 'arrive':
+            self._jobs[job.pid] = [now, None, now, 0, 0]
+            return
+        record = self._jobs.get(job.pid)
+        if record is None:  # Arrived before collector was attached
+            first_run = now if event in ('preempt', 'terminate') else None  # Was running already
+            record = self._jobs[job.pid] = [now, first_run, now, 0, 0]
+        if event == 'admit':
+            self._memory(now, job.required_memory)
+        elif event == 'dispatch':
+            record[3] += now - record[2]
+            if record[1] is None:
+                record[1] = now
+            self._running_since[job.pid] = now
+        elif event in ('preempt', 'terminate'):
+            since = self._running_since.pop(job.pid, None)
+            if since is not None:
+                self.busy += now - since
+        elif event == 'suspend':
+            record[3] += now - record[2]
+        elif event == 'resume':
+            record[4] += now - record[2]
+        record[2] = now
+
+        if event == 'terminate':
+            self._memory(now, -job.required_memory)
+            del self._jobs[job.pid]
+            arrival, first_run, _, waiting, suspended = record
+            self.turnaround.add(now - arrival)
+            self.waiting.add(waiting)
+            self.response.add(first_run - arrival)
+            self.suspended.add(suspended)
+            if self.sink is not None:
+                self.sink(job.pid, {'arrival': arrival, 'first_run': first_run, 'terminated': now,
+                                    'turnaround': now - arrival, 'waiting': waiting,
+                                    'response': first_run - arrival, 'suspended': suspended})
+
+    def _memory(self, now, change):
+        self._memory_area += self.memory_used * (now - self._memory_since)
+        self._memory_since = now
+        self.memory_used += change
+        self.memory_peak = max(self.memory_peak, self.memory_used)
+
+    def summary(self):
+        """
+        :return: dict of metrics so far
+        """
+        now = self.engine.now
+        elapsed = now - self.start
+        busy = self.busy + sum(now - since for since in self._running_since.values())
+        memory_area = self._memory_area + self.memory_used * (now - self._memory_since)
+        return {
+            'elapsed': elapsed,
+            'terminated': self.turnaround.count,
+            'in_system': len(self._jobs),
+            'cpu_utilisation': busy / elapsed / self.cpus if elapsed else None,
+            'throughput': self.turnaround.count / elapsed if elapsed else None,
+            'memory_occupancy': memory_area / elapsed / self.memory_total if elapsed else None,
+            'memory_peak': self.memory_peak / self.memory_total,
+            'transitions': dict(self.transitions),
+            'turnaround': self.turnaround.summary(),
+            'waiting': self.waiting.summary(),
+            'response': self.response.summary(),
+            'suspended': self.suspended.summary(),
+        }
@@ -0,0 +1,242 @@
+"""
+Multi-CPU simulation
+
+MultiCoreEngine runs the headless engine with several simulated CPUs, each
+with its own ready pool (any policy) and running job. A dispatch only touches
+its own core's queue; other cores are looked at only when admitting a job
+(it goes to the least loaded core), when a core runs dry and steals a waiting
+job from the busiest one, and by the periodic load balancer. A job run on a
+different core than last time pays migration_cost before doing any work.
+A moved job takes its policy state along, such as its MLFQ level or its CFS
+virtual runtime relative to the old core's minimum.
+"""
+import heapq
+from engine import Engine, ReadyPool, MEM_OS_TAKE
+
+
+class Core(object):
+    def __init__(self, index, ready_pool):
+        self.index = index
+        self.ready_pool = ready_pool
+        self.running = None
+        self.dispatch_pending = False
+
+    def __repr__(self):
+        return "<Core {0} ({1} ready, running {2})>".format(self.index, self.ready_pool.num, self.running)
+
+    @property
+    def waiting(self):
+        """
+        :return: number of jobs waiting in ready pool, not counting the running one
+        """
+        return self.ready_pool.num - (1 if self.running is not None else 0)
+
+    def waiting_job(self):
+        """
+        :return: a waiting job that could move to another core, or None
+        """
+        for job in self.ready_pool:
+            if job is not self.running:
+                return job
+        return None
+
+
+class MultiCoreEngine(Engine):
+    """
+    Engine with N cores
+
+    Events are the same as Engine's plus ``migrate``, when a waiting job is
+    moved to another core by stealing or balancing. core_of tells which core
+    a job is queued on.
+    """
+
+    def __init__(self, cores=4, make_ready_pool=ReadyPool, memory=None, mem_os_take=MEM_OS_TAKE,
+                 migration_cost=0, balance_interval=None, steal=True, clock=None):
+        """
+        :param cores: number of CPUs
+        :param make_ready_pool: callable making one core's ready pool
+        :param memory: allocator shared by all cores
+        :param migration_cost: virtual time a job loses when it runs on another core than last time
+        :param balance_interval: virtual time between load balancing passes, None for none
+        :param steal: let an idle core take a waiting job from the busiest core
+        :param clock: optional clock.VirtualClock pacing the run
+        """
+        super().__init__(ready_pool=make_ready_pool(), memory=memory, mem_os_take=mem_os_take, clock=clock)
+        self.cores = [Core(0, self.ready_pool)] + [Core(index, make_ready_pool()) for index in range(1, cores)]
+        self.migration_cost = migration_cost
+        self.balance_interval = balance_interval
+        self.steal = steal
+        self.migrations = 0  # Dispatches that paid migration cost
+        self.steals = 0
+        self._core_of = {}  # pid -> Core job is queued on, kept while suspended
+        self._last_core = {}  # pid -> index of core job last ran on
+        self._admit_pending = False
+        self._balancing = False
+        self._loads = [(0, core.index) for core in self.cores]  # Heap of (jobs in ready pool, index), may be stale
+        self._idle = set(range(cores))  # Indexes of cores running nothing
+
+    def core_of(self, job):
+        """
+        :return: Core job is queued on, or None
+        """
+        return self._core_of.get(job.pid)
+
+    def _load_changed(self, core):
+        loads = self._loads
+        if len(loads) > 4 * len(self.cores):
+            # Mostly stale entries, start over
+            loads[:] = [(other.ready_pool.num, other.index) for other in self.cores]
+            heapq.heapify(loads)
+        else:
+            heapq.heappush(loads, (core.ready_pool.num, core.index))
+
+    def _queued(self, job, core):
+        self._core_of[job.pid] = core
+        core.ready_pool.add(job)
+        self._load_changed(core)
+
+    def _move(self, job, source, target):
+        state = source.ready_pool.migrate_out(job)
+        self._load_changed(source)
+        self._core_of[job.pid] = target
+        target.ready_pool.migrate_in(job, state)
+        self._load_changed(target)
+        self._emit('migrate', job)
+
+    def suspend(self, pid):
+        core = self._core_of.get(int(pid))
+        if core is None:
+            return None
+        job = core.ready_pool.item(pid)
+        if job is None or job.status != 'ready':
+            return None
+        core.ready_pool.suspend(job)
+        self._load_changed(core)
+        self.suspend_pool.add(job)
+        self._emit('suspend', job)
+        return job
+
+    def resume(self, pid):
+        job = self.suspend_pool.remove(pid)
+        if job is None:
+            return None
+        core = self._core_of[job.pid]  # Back where it was, that pool counted it as suspended
+        core.ready_pool.resume(job)
+        self._load_changed(core)
+        self._emit('resume', job)
+        self._wake_core(core)
+        return job
+
+    def _room(self):
+        """
+        :return: least loaded core with room, lowest index first, or None
+        """
+        loads, cores = self._loads, self.cores
+        while loads:
+            num, index = loads[0]
+            ready_pool = cores[index].ready_pool
+            if num == ready_pool.num and num < ready_pool.count:
+                return cores[index]
+            heapq.heappop(loads)  # Stale or full, pushed again when its load changes
+        return None
+
+    def _place(self, job, core):
+        self._queued(job, core)
+        self._wake_core(core)
+
+    def _in_system(self):
+        return self.job_pool.num or any(core.ready_pool.num for core in self.cores)
+
+    def _arrive(self, job):
+        super()._arrive(job)
+        if self.balance_interval and not self._balancing:
+            self._balancing = True
+            self.schedule(self.now + self.balance_interval, self._balance)
+
+    def _wake(self):
+        # Something may be admitted; Engine calls this on arrival
+        if not self._admit_pending:
+            self._admit_pending = True
+            self.schedule(self.now, self._admit)
+
+    def _admit(self):
+        self._admit_pending = False
+        self.long_term_schedule()
+        if self.steal:
+            for index in sorted(self._idle):
+                self._wake_core(self.cores[index])
+
+    def _wake_core(self, core):
+        if core.running is None and not core.dispatch_pending:
+            core.dispatch_pending = True
+            self.schedule(self.now, self._dispatch, core)
+
+    def _steal(self, thief):
+        victim = max(self.cores, key=lambda core: core.waiting)
+        if victim is thief or victim.waiting == 0:
+            return
+        self._move(victim.waiting_job(), victim, thief)
+        self.steals += 1
+
+    def _balance(self):
+        """
+        Even out waiting jobs: move from the busiest core to the idlest until
+        they differ by at most one
+        """
+        for _ in range(len(self.cores) * self.ready_pool.max):
+            busiest = max(self.cores, key=lambda core: core.waiting)
+            idlest = min((core for core in self.cores if core.ready_pool.num < core.ready_pool.count),
+                         key=lambda core: core.waiting, default=None)
+            if idlest is None or busiest.waiting - idlest.waiting <= 1:
+                break
+            self._move(busiest.waiting_job(), busiest, idlest)
+            self._wake_core(idlest)
+        if self._in_system():
+            self.schedule(self.now + self.balance_interval, self._balance)
+        else:
+            self._balancing = False
+
+    def _dispatch(self, core):
+        core.dispatch_pending = False
+        if core.running is not None:
+            return
+        ready_pool = core.ready_pool
+        if ready_pool.num == 0 and self.steal:
+            self._steal(core)
+        if ready_pool.num == 0:
+            return
+
+        job = ready_pool.get()
+        job.status = 'running'
+        core.running = job
+        self._idle.discard(core.index)
+        self.running = job  # Last job dispatched on any core
+        self.ticks += 1
+        ready_pool.change_priority(job)
+        self._emit('dispatch', job)
+        cost = 0
+        if self._last_core.get(job.pid, core.index) != core.index:
+            cost = self.migration_cost
+            self.migrations += 1
+        self._last_core[job.pid] = core.index
+        self.schedule(self.now + cost + ready_pool.time_slice(job), self._complete, core, job)
+
+    def _complete(self, core, job):
+        core.running = None
+        self._idle.add(core.index)
+        if self.running is job:
+            self.running = None
+        ready_pool = core.ready_pool
+        ready_pool.minus_time(job)
+        if job.required_time == 0:
+            ready_pool.remove(job)
+            self._load_changed(core)
+            del self._core_of[job.pid]
+            self._last_core.pop(job.pid, None)
+            self._freed(job)
+            self.terminated_pool.add(job)
+            self._emit('terminate', job)
+            self._wake()  # Room and memory for another job
+        else:
+            self._emit('preempt', job)
+        self._wake_core(core)
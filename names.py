@@ -0,0 +1,43 @@
+"""
+Job names worked out from PIDs
+
+A job's name is a function of its PID and a seed, so it never has to be
+stored or drawn when the job is made: it is computed when something shows it.
+Names look like name_generator.gen_one_word_digit's, a first name and a number
+up to 1000, taken from names.txt, the names of name_generator's list built
+once into a plain file and read the first time a name is asked for.
+"""
+import os
+
+NAME_SEED = 0
+NAMES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'names.txt')
+_MASK = (1 << 64) - 1
+_names = None
+
+
+def _table():
+    global _names
+    if _names is None:
+        with open(NAMES_FILE, encoding='utf8') as file:
+            _names = tuple(file.read().split())
+    return _names
+
+
+def _mix(value):
+    """
+    splitmix64 finalizer: spreads consecutive PIDs over the whole table
+    """
+    value = (value ^ (value >> 30)) * 0xbf58476d1ce4e5b9 & _MASK
+    value = (value ^ (value >> 27)) * 0x94d049bb133111eb & _MASK
+    return value ^ (value >> 31)
+
+
+def name_for(pid, seed=None):
+    """
+    :param pid: PID of job
+    :param seed: changes every name, NAME_SEED by default
+    :return: name of job, the same every time for the same PID and seed
+    """
+    names = _table()
+    value = _mix((pid * 0x9e3779b97f4a7c15 + (NAME_SEED if seed is None else seed)) & _MASK)
+    return names[value % len(names)] + str(value // len(names) % 1001)
@@ -0,0 +1,312 @@
+import random
+import sys
+import threading
+from array import array
+from collections import deque
+from names import name_for
+
+try:
+    from termcolor import cprint
+except ImportError:  # termcolor is optional, PCB.__str__ prints plain text without it
+    def cprint(text, color=None, end='\n'):
+        print(text, end=end)
+
+PID_MIN = 1
+PID_MAX = 10000
+
+# Job statuses. CPython interns these literals, so every PCB holding one shares
+# the same string; PCBTable keeps them as one-byte codes instead.
+STATUSES = ('new', 'ready', 'running', 'suspend', 'terminated')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+class PIDAllocator(object):
+    """
+    Hands out unique PIDs from [low, high] in O(1) and takes them back when
+    jobs terminate
+
+    In order mode fresh PIDs are given out counting up, then released ones
+    oldest first, so a PID is reused as late as possible. Randomized mode picks
+    uniformly among free PIDs, like the old retry loop did but without retrying,
+    at the cost of an index over the whole range. A bitmap records which PIDs
+    are in use. Safe to share between threads.
+    """
+
+    def __init__(self, low=PID_MIN, high=PID_MAX, randomized=False, rng=random):
+        self.low = low
+        self.high = high
+        self.randomized = randomized
+        self.rng = rng
+        self.lock = threading.Lock()
+        self._used = bytearray(high - low + 1)
+        self.count = 0  # PIDs in use
+        if randomized:
+            self._free = array('q', range(low, high + 1))  # Free PIDs in any order
+        else:
+            self._next = low  # Lowest PID never given out
+            self._released = deque()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['lock']
+        if state['rng'] is random:
+            state['rng'] = None  # The random module, its state is saved on its own
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.rng is None:
+            self.rng = random
+        self.lock = threading.Lock()
+
+    def __contains__(self, pid):
+        return self.low <= pid <= self.high and self._used[pid - self.low] == 1
+
+    def __len__(self):
+        return self.count
+
+    def allocate(self):
+        """
+        :return: a free PID, now in use
+        """
+        with self.lock:
+            if self.randomized:
+                free = self._free
+                if not free:
+                    raise RuntimeError("All PIDs from {0} to {1} are in use".format(self.low, self.high))
+                position = self.rng.randrange(len(free))
+                pid = free[position]
+                free[position] = free[-1]
+                free.pop()
+            elif self._next <= self.high:
+                pid = self._next
+                self._next += 1
+            elif self._released:
+                pid = self._released.popleft()
+            else:
+                raise RuntimeError("All PIDs from {0} to {1} are in use".format(self.low, self.high))
+            self._used[pid - self.low] = 1
+            self.count += 1
+            return pid
+
+    def release(self, pid):
+        """
+        Give a PID back. PIDs outside the range or not in use are ignored.
+
+        :param pid: PID of a terminated job
+        """
+        with self.lock:
+            if pid not in self:
+                return
+            self._used[pid - self.low] = 0
+            self.count -= 1
+            if self.randomized:
+                self._free.append(pid)
+            else:
+                self._released.append(pid)
+
+
+pid_allocator = PIDAllocator(randomized=True)  # PIDs of jobs made by PCB.random and generate_pid
+
+
+def _given_name(name):
+    # None means work name out from PID when asked, an empty name is "process"
+    return name if name is None else (name or "process")
+
+
+class PCB(object):
+    def __init__(self, pid, name="process", priority=1, required_time=200, required_memory=None):
+        self.pid = pid
+        self._name = _given_name(name)
+        self.priority = priority if priority else 1
+        self.required_time = required_time if required_time else 200
+        self.status = 'new'
+        self.address = hex(id(self))
+        self.age = 0
+        self.required_memory = required_memory if required_memory else random.randint(1, 10)
+        self.allocated_memory_start = None
+
+    @property
+    def name(self):
+        return self._name if self._name is not None else name_for(self.pid)
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+
+    def __str__(self):
+        cprint("<PCB {0} {2}[{1}]> priority:".format(str(self.pid),
+                                                     str(self.status),
+                                                     self.name), end='')
+        cprint("{0}".format(str(self.priority)), color='red', end='')
+        cprint(" need_time:{0} address:{1}".format(str(self.required_time), self.address), end='')
+        return ''
+
+    def __repr__(self):
+        return "<PCB {0} {3}[{1}]> priority:{2} need_time:{4}".format(str(self.pid),
+                                                                      str(self.status),
+                                                                      str(self.priority),
+                                                                      self.name,
+                                                                      str(self.required_time))
+
+    @staticmethod
+    def random():
+        """
+        Generate a random job
+
+        :return: a random job object
+        """
+        pid = pid_allocator.allocate()
+        priority = random.randint(1, 7)
+        required_time = random.randint(200, 1000)
+        return PCB(pid, None, priority, required_time)  # Name comes from PID when shown
+
+    @staticmethod
+    def generate_pid():
+        """
+        Generate a random PID number, release it with pid_allocator.release
+
+        :return: an unique int number
+        """
+        return pid_allocator.allocate()
+
+
+class CompactPCB(object):
+    """
+    PCB without a per-instance __dict__ and with address worked out only when
+    it is read, for runs with millions of jobs. Behaves like PCB otherwise.
+    """
+    __slots__ = ('pid', '_name', 'priority', 'required_time', 'status', 'age', 'required_memory',
+                 'allocated_memory_start')
+
+    def __init__(self, pid, name="process", priority=1, required_time=200, required_memory=None):
+        self.pid = pid
+        self._name = _given_name(name)
+        self.priority = priority if priority else 1
+        self.required_time = required_time if required_time else 200
+        self.status = 'new'
+        self.age = 0
+        self.required_memory = required_memory if required_memory else random.randint(1, 10)
+        self.allocated_memory_start = None
+
+    name = PCB.name
+
+    @property
+    def address(self):
+        return hex(id(self))
+
+    __str__ = PCB.__str__
+    __repr__ = PCB.__repr__
+
+
+class PCBTable(object):
+    """
+    PCBs stored column by column in typed arrays
+
+    A job is a row; new() appends one and returns a PCBView, a two-slot object
+    that reads and writes the row's columns, so it can stand in for a PCB in
+    pools. Numeric columns take 4 or 8 bytes a job and status one byte.
+    """
+
+    def __init__(self):
+        self.pid = array('q')
+        self.priority = array('d')
+        self.required_time = array('q')
+        self.status = array('b')
+        self.age = array('q')
+        self.required_memory = array('q')
+        self.allocated_memory_start = array('q')  # -1 when not allocated
+        self.names = []  # None for names worked out from PID
+
+    def __len__(self):
+        return len(self.pid)
+
+    def new(self, pid, name="process", priority=1, required_time=200, required_memory=None):
+        """
+        Add a job, with the same defaults as PCB
+
+        :return: PCBView of the job
+        """
+        self.pid.append(pid)
+        self.priority.append(priority if priority else 1)
+        self.required_time.append(required_time if required_time else 200)
+        self.status.append(STATUS_CODES['new'])
+        self.age.append(0)
+        self.required_memory.append(required_memory if required_memory else random.randint(1, 10))
+        self.allocated_memory_start.append(-1)
+        name = _given_name(name)
+        self.names.append(sys.intern(name) if name is not None else None)
+        return PCBView(self, len(self.pid) - 1)
+
+    def view(self, row):
+        """
+        :param row: row of a job
+        :return: PCBView of the job
+        """
+        return PCBView(self, row)
+
+
+def _column(name):
+    def getter(view):
+        return getattr(view.table, name)[view.row]
+
+    def setter(view, value):
+        getattr(view.table, name)[view.row] = value
+
+    return property(getter, setter)
+
+
+class PCBView(object):
+    """
+    One row of a PCBTable, with the attributes of a PCB
+    """
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    pid = _column('pid')
+    priority = _column('priority')
+    required_time = _column('required_time')
+    age = _column('age')
+    required_memory = _column('required_memory')
+
+    @property
+    def name(self):
+        name = self.table.names[self.row]
+        return name if name is not None else name_for(self.pid)
+
+    @name.setter
+    def name(self, value):
+        self.table.names[self.row] = value
+
+    @property
+    def status(self):
+        return STATUSES[self.table.status[self.row]]
+
+    @status.setter
+    def status(self, value):
+        self.table.status[self.row] = STATUS_CODES[value]
+
+    @property
+    def allocated_memory_start(self):
+        start = self.table.allocated_memory_start[self.row]
+        return None if start < 0 else start
+
+    @allocated_memory_start.setter
+    def allocated_memory_start(self, value):
+        self.table.allocated_memory_start[self.row] = -1 if value is None else value
+
+    @property
+    def address(self):
+        return "{0}[{1}]".format(hex(id(self.table)), self.row)
+
+    def __eq__(self, other):
+        return isinstance(other, PCBView) and other.table is self.table and other.row == self.row
+
+    def __hash__(self):
+        return hash((id(self.table), self.row))
+
+    __str__ = PCB.__str__
+    __repr__ = PCB.__repr__
@@ -0,0 +1,257 @@
+"""
+Scheduling policies for the headless engine
+
+Each policy is a ready pool: it owns the data structure jobs wait in, decides
+which job runs next (get), how long it may run (time_slice) and what happens
+to it afterwards (minus_time). Pick one per run with make_ready_pool.
+"""
+from collections import OrderedDict
+from engine import ReadyPool, HeapReadyPool, LazyAgingReadyPool, _pid_of
+
+try:
+    from vectorized import NumpyReadyPool
+except ImportError:  # numpy is optional
+    NumpyReadyPool = None
+
+
+class _QueueReadyPool(ReadyPool):
+    """
+    Ready pool served in the order of the PID-indexed queue every pool keeps,
+    so dispatch, requeue and removal of any job are all O(1)
+    """
+
+    def get(self):
+        if self._pool:
+            return next(iter(self._pool.values()))
+        return None
+
+    def change_priority(self, job):
+        job.age = 0
+
+
+class FCFSReadyPool(_QueueReadyPool):
+    """
+    First come first served, each job runs to completion
+    """
+
+    def time_slice(self, job):
+        return job.required_time
+
+
+class RoundRobinReadyPool(_QueueReadyPool):
+    """
+    Round robin, a job goes to the back of the queue after each quantum
+    """
+
+    def minus_time(self, job):
+        consumed = super().minus_time(job)
+        self._pool.move_to_end(job.pid)
+        return consumed
+
+
+class SJFReadyPool(HeapReadyPool):
+    """
+    Shortest job first, non-preemptive, heap keyed on required_time
+    """
+
+    def key(self, job):
+        return job.required_time
+
+    def time_slice(self, job):
+        return job.required_time
+
+    def change_priority(self, job):
+        job.age = 0
+
+
+class SRTFReadyPool(SJFReadyPool):
+    """
+    Shortest remaining time first. Jobs are preempted at quantum boundaries,
+    where a shorter job that arrived meanwhile takes over.
+    """
+
+    def time_slice(self, job):
+        return ReadyPool.time_slice(self, job)
+
+    def minus_time(self, job):
+        consumed = super().minus_time(job)
+        self._pool.update(job.pid, (job.required_time, self._pool.key(job.pid)[1]))
+        return consumed
+
+
+class MLFQReadyPool(ReadyPool):
+    """
+    Multi-level feedback queue
+
+    Level n has a quantum of quantum * 2 ** n. A job that uses its whole slice
+    drops one level, and every boost_interval dispatches all jobs go back to
+    the top level so long jobs can not starve.
+    """
+
+    def __init__(self, *args, levels=3, boost_interval=100, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._levels = [OrderedDict() for _ in range(levels)]
+        self._level_of = {}  # pid -> level
+        self.boost_interval = boost_interval
+        self.dispatches = 0
+
+    def __len__(self):
+        return len(self._level_of)
+
+    def __iter__(self):
+        for level in self._levels:
+            yield from level.values()
+
+    @property
+    def num(self):
+        return len(self._level_of)
+
+    def add(self, job):
+        self._levels[0][job.pid] = job
+        self._level_of[job.pid] = 0
+        job.status = self.status
+
+    def item(self, pid):
+        level = self._level_of.get(int(pid))
+        if level is None:
+            return None
+        return self._levels[level][int(pid)]
+
+    def remove(self, identifier):
+        pid = _pid_of(identifier)
+        level = self._level_of.pop(pid, None)
+        if level is None:
+            return None
+        return self._levels[level].pop(pid)
+
+    def migrate_out(self, job):
+        level = self._level_of[job.pid]
+        self.remove(job)
+        return level
+
+    def migrate_in(self, job, level):
+        # Same level on the new core, at the back of it
+        self._levels[level][job.pid] = job
+        self._level_of[job.pid] = level
+        job.status = self.status
+
+    def get(self):
+        for level in self._levels:
+            if level:
+                return next(iter(level.values()))
+        return None
+
+    def change_priority(self, job):
+        job.age = 0
+        self.dispatches += 1
+        if self.dispatches % self.boost_interval == 0:
+            self._boost()
+
+    def _boost(self):
+        top = self._levels[0]
+        for level in self._levels[1:]:
+            top.update(level)
+            level.clear()
+        for pid in self._level_of:
+            self._level_of[pid] = 0
+
+    def time_slice(self, job):
+        return min(self.quantum << self._level_of[job.pid], job.required_time)
+
+    def minus_time(self, job):
+        level = self._level_of[job.pid]
+        consumed = super().minus_time(job)
+        if consumed == self.quantum << level and level < len(self._levels) - 1:
+            # Used up its whole slice, demote
+            del self._levels[level][job.pid]
+            self._levels[level + 1][job.pid] = job
+            self._level_of[job.pid] = level + 1
+        else:
+            self._levels[level].move_to_end(job.pid)
+        return consumed
+
+
+class CFSReadyPool(HeapReadyPool):
+    """
+    Completely fair scheduler style policy
+
+    Runs the job with the smallest virtual runtime. Virtual runtime grows by
+    the time a job runs scaled by 1.25 ** priority, so a job with a smaller
+    priority number gets a bigger share of CPU. The slice is target_latency
+    split between waiting jobs, but never under min_granularity. Jobs are kept
+    in an indexed heap, which gives the same O(log n) pick, insert and removal
+    as the red-black tree used by Linux.
+    """
+
+    def __init__(self, *args, target_latency=None, min_granularity=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.target_latency = target_latency if target_latency is not None else self.quantum * 6
+        self.min_granularity = min_granularity if min_granularity is not None else max(1, self.quantum // 4)
+        self.min_vruntime = 0.0
+        self._vruntime = {}  # pid -> virtual runtime, kept while a job is suspended
+
+    def key(self, job):
+        # A job (re)joining starts at the current minimum so it can not hog CPU
+        vruntime = max(self._vruntime.get(job.pid, 0.0), self.min_vruntime)
+        self._vruntime[job.pid] = vruntime
+        return vruntime
+
+    def remove(self, identifier):
+        job = super().remove(identifier)
+        if job is not None and job.required_time == 0:
+            del self._vruntime[job.pid]
+        return job
+
+    def migrate_out(self, job):
+        # Only the lead over this pool's minimum means anything on another core
+        lead = self._vruntime.pop(job.pid) - self.min_vruntime
+        super().remove(job)
+        return lead
+
+    def migrate_in(self, job, lead):
+        self._vruntime[job.pid] = self.min_vruntime + lead
+        self.add(job)
+
+    def change_priority(self, job):
+        job.age = 0
+
+    def time_slice(self, job):
+        return min(max(self.min_granularity, self.target_latency // max(1, len(self._pool))), job.required_time)
+
+    def minus_time(self, job):
+        consumed = super().minus_time(job)
+        vruntime = self._vruntime[job.pid] + consumed * 1.25 ** job.priority
+        self._vruntime[job.pid] = vruntime
+        self._pool.update(job.pid, (vruntime, self._pool.key(job.pid)[1]))
+        self.min_vruntime = max(self.min_vruntime, self._pool.key(self._pool.peek().pid)[0])
+        return consumed
+
+
+POLICIES = {
+    'priority': ReadyPool,
+    'priority-heap': HeapReadyPool,
+    'priority-lazy': LazyAgingReadyPool,
+    'fcfs': FCFSReadyPool,
+    'sjf': SJFReadyPool,
+    'srtf': SRTFReadyPool,
+    'rr': RoundRobinReadyPool,
+    'mlfq': MLFQReadyPool,
+    'cfs': CFSReadyPool,
+}
+if NumpyReadyPool is not None:
+    POLICIES['priority-numpy'] = NumpyReadyPool
+
+
+def make_ready_pool(mode='priority', **kwargs):
+    """
+    Create the ready pool for a scheduling mode
+
+    :param mode: one of POLICIES
+    :param kwargs: passed to the ready pool, e.g. max, quantum
+    :return: ready pool instance
+    """
+    try:
+        policy = POLICIES[mode]
+    except KeyError:
+        raise ValueError("Unknown scheduling mode {0!r}, choose from {1}".format(mode, ", ".join(sorted(POLICIES))))
+    return policy(**kwargs)
@@ -0,0 +1,147 @@
+"""
+Indexed binary heap
+
+A min-heap that also remembers where every item sits, so an item's key can be
+changed (decrease-key / increase-key) or the item removed in O(log n) without
+searching or re-heapifying.
+"""
+
+
+class IndexedPriorityQueue(object):
+    def __init__(self):
+        self._heap = []  # [key, ident, item] entries
+        self._index = {}  # ident -> position in self._heap
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, ident):
+        return ident in self._index
+
+    def __iter__(self):
+        """
+        Iterate items in heap order (not sorted order)
+        """
+        return (entry[2] for entry in self._heap)
+
+    def push(self, ident, key, item):
+        """
+        Insert an item
+
+        :param ident: unique hashable identifier, e.g. PID
+        :param key: sort key, smallest comes out first
+        :param item: object to store
+        """
+        if ident in self._index:
+            raise KeyError("{0} is already queued".format(ident))
+        self._heap.append([key, ident, item])
+        self._index[ident] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def peek(self):
+        """
+        :return: item with the smallest key, or None if empty
+        """
+        if self._heap:
+            return self._heap[0][2]
+        return None
+
+    def pop(self):
+        """
+        Remove and return the item with the smallest key
+
+        :return: item, or None if empty
+        """
+        if self._heap:
+            return self._remove_at(0)
+        return None
+
+    def get(self, ident):
+        """
+        :return: item for ident, or None
+        """
+        position = self._index.get(ident)
+        if position is None:
+            return None
+        return self._heap[position][2]
+
+    def key(self, ident):
+        """
+        :return: current key of ident
+        """
+        return self._heap[self._index[ident]][0]
+
+    def update(self, ident, key):
+        """
+        Change the key of a queued item, moving it up or down as needed
+
+        :param ident: identifier of item
+        :param key: new key
+        """
+        position = self._index[ident]
+        entry = self._heap[position]
+        old_key = entry[0]
+        entry[0] = key
+        if key < old_key:
+            self._sift_up(position)
+        elif old_key < key:
+            self._sift_down(position)
+
+    def remove(self, ident):
+        """
+        Remove an item
+
+        :return: removed item, or None if ident is not queued
+        """
+        position = self._index.get(ident)
+        if position is None:
+            return None
+        return self._remove_at(position)
+
+    def _remove_at(self, position):
+        heap = self._heap
+        entry = heap[position]
+        del self._index[entry[1]]
+        last = heap.pop()
+        if position < len(heap):
+            heap[position] = last
+            self._index[last[1]] = position
+            # The moved entry may belong above or below its new place
+            if position and last[0] < heap[(position - 1) >> 1][0]:
+                self._sift_up(position)
+            else:
+                self._sift_down(position)
+        return entry[2]
+
+    def _sift_up(self, position):
+        heap, index = self._heap, self._index
+        entry = heap[position]
+        while position:
+            parent_position = (position - 1) >> 1
+            parent = heap[parent_position]
+            if not entry[0] < parent[0]:
+                break
+            heap[position] = parent
+            index[parent[1]] = position
+            position = parent_position
+        heap[position] = entry
+        index[entry[1]] = position
+
+    def _sift_down(self, position):
+        heap, index = self._heap, self._index
+        size = len(heap)
+        entry = heap[position]
+        child_position = 2 * position + 1
+        while child_position < size:
+            right_position = child_position + 1
+            if right_position < size and heap[right_position][0] < heap[child_position][0]:
+                child_position = right_position
+            child = heap[child_position]
+            if not child[0] < entry[0]:
+                break
+            heap[position] = child
+            index[child[1]] = position
+            position = child_position
+            child_position = 2 * position + 1
+        heap[position] = entry
+        index[entry[1]] = position
@@ -1,23 +1,22 @@
 import mainwindow
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTableWidgetItem, QTableWidget
+from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5 import QtCore, QtGui
-import random
-import time
 import threading
 import functools
-import name_generator
+from collections import OrderedDict
 from termcolor import cprint
+from pcb import PCB, pid_allocator
+from engine import PRIORITY_ADD_EACH_TERN, PRIORITY_MAX, AGING_TABLE, TOTAL_MEM, MEM_OS_TAKE, QUANTUM
+from allocators import make_memory
+from clock import VirtualClock, SPEEDS
 
 MODE = 'priority'  # priority is the only available choice
-CPU_PROCESS_TIME = 0.7  # Waiting time for clearer show
-PRIORITY_ADD_EACH_TERN = 0.5  # Add priority each tern
-PRIORITY_MAX = 10  # Limit job's max priority to avoid too big priority
-AGING_TABLE = [0.1, 0.1, 0.2, 0.4, 0.4, 0.5, 1.0, 1.0, 1.5, 1.5, 2.0, 2.5, 3.0, 3.5, 3.8]
-COLOR_MEMORY = QtGui.QColor(12, 249, 20)
-COLOR_USED_MEMORY = QtGui.QColor(255, 152, 0)
-TOTAL_MEM = 122
-MEM_OS_TAKE = 20  # How much memory would operating system take
+CPU_PROCESS_TIME = 0.7  # Real seconds a quantum takes at speed 1, for clearer show
+SPEED = 1  # Initial speed, one of clock.SPEEDS
+MEMORY_BACKEND = 'first-fit'  # Allocator, see allocators.MEMORY_BACKENDS
+UI_FRAME_INTERVAL = 16  # Milliseconds between UI updates, about 60 Hz
+STATUS_MESSAGE_TIME = 5000  # Milliseconds a status bar message stays
 
 
 def mutex_lock(fun):
@@ -40,102 +39,159 @@ def mutex_lock(fun):
     return wrapper
 
 
-class PCB(object):
-    def __init__(self, pid, name="process", priority=1, required_time=200):
-        self.pid = pid
-        self.name = name if name else "process"
-        self.priority = priority if priority else 1
-        self.required_time = required_time if required_time else 200
-        self.status = 'new'
-        self.address = hex(id(self))
-        self.age = 0
-        self.required_memory = random.randint(1, 10)
-        self.allocated_memory_start = None
+def wake_schedulers():
+    """
+    Wake up scheduling threads waiting for pools or memory to change
+    """
+    with SCHEDULER_CONDITION:
+        SCHEDULER_CONDITION.notify_all()
 
-    def __str__(self):
-        cprint("<PCB {0} {2}[{1}]> priority:".format(str(self.pid),
-                                                     str(self.status),
-                                                     self.name), end='')
-        cprint("{0}".format(str(self.priority)), color='red', end='')
-        cprint(" need_time:{0} address:{1}".format(str(self.required_time), self.address), end='')
-        return ''
 
-    def __repr__(self):
-        return "<PCB {0} {3}[{1}]> priority:{2} need_time:{4}".format(str(self.pid),
-                                                                      str(self.status),
-                                                                      str(self.priority),
-                                                                      self.name,
-                                                                      str(self.required_time))
+def wakes_schedulers(fun):
+    """
+    Decorator waking scheduling threads after fun returns. Put it outside
+    mutex_lock so a pool lock is never held while taking SCHEDULER_CONDITION.
 
-    @staticmethod
-    def random():
-        """
-        Generate a random job
+    :param fun: function to decorate
+    :return: wrapped function
+    """
 
-        :return: a random job object
-        """
-        pid = random.randint(1, 10000)
-        # Avoid duplicated PID
-        while pid in used_PIDs:
-            pid = random.randint(1, 10000)
-        name = name_generator.gen_one_word_digit(lowercase=False)
-        priority = random.randint(1, 7)
-        required_time = random.randint(200, 1000)
-        used_PIDs.add(pid)
-        return PCB(pid, name, priority, required_time)
+    @functools.wraps(fun)
+    def wrapper(*args):
+        value = fun(*args)
+        wake_schedulers()
+        return value
 
-    @staticmethod
-    def generate_pid():
-        """
-        Generate a random PID number
+    return wrapper
 
-        :return: an unique int number
-        """
-        pid = random.randint(1, 10000)
-        # Avoid duplicated PID
-        while pid in used_PIDs:
-            pid = random.randint(1, 10000)
-        return pid
 
+class UpdateBus(object):
+    """
+    Collects UI changes from any thread and hands them to the GUI once a frame
 
-class Pool(QtCore.QObject):
-    refreshTableSignal = QtCore.pyqtSignal("QString", PCB, "QString")
-    editTableSignal = QtCore.pyqtSignal("QString", int, int, "QString")
-    running_label_change_signal = QtCore.pyqtSignal("QString")
+    Changes are merged while they wait: a row added and removed within one
+    frame never reaches its table, edits are kept once per job and column, any
+    number of memory changes make one repaint of the memory map and the
+    running label keeps only its latest text. So however fast the schedulers
+    run, a frame costs at most one update per row and cell that changed.
+    """
 
     def __init__(self):
-        super().__init__()
-        self._pool = []
+        self.lock = threading.Lock()
+        self._rows = OrderedDict()  # (model, PID) -> (operation, job), in order of arrival
+        self._edits = OrderedDict()  # model -> {PID: (job, columns)}
+        self._memory_changed = False
+        self._label = None
 
-        # Set table controller and mutex lock for each pool
+    @mutex_lock
+    def append(self, model, job):
+        key = (model, job.pid)
+        pending = self._rows.pop(key, None)
+        # A row removed earlier this frame is moved to the end
+        self._rows[key] = ("move" if pending and pending[0] != "append" else "append", job)
+
+    @mutex_lock
+    def remove(self, model, job):
+        key = (model, job.pid)
+        pending = self._rows.pop(key, None)
+        if pending is None or pending[0] != "append":
+            self._rows[key] = ("remove", job)
+
+    @mutex_lock
+    def edit(self, model, jobs, column):
+        edits = self._edits.setdefault(model, {})
+        for job in jobs:
+            if job.pid in edits:
+                edits[job.pid][1].add(column)
+            else:
+                edits[job.pid] = (job, {column})
+
+    @mutex_lock
+    def memory(self):
+        self._memory_changed = True
+
+    @mutex_lock
+    def running_label(self, text):
+        self._label = text
+
+    @mutex_lock
+    def _take(self):
+        taken = self._rows, self._edits, self._memory_changed, self._label
+        self._rows, self._edits, self._memory_changed, self._label = OrderedDict(), OrderedDict(), False, None
+        return taken
+
+    def flush(self, main_window):
+        """
+        Apply pending changes, call from GUI thread only
+
+        :param main_window: MainWindow to update
+        """
+        rows, edits, memory_changed, label = self._take()
+
+        # Consecutive appends to a model go in as one block of rows
+        block_model, block = None, []
+        for (model, _), (operation, job) in rows.items():
+            if operation == "append" and block and model is block_model:
+                block.append(job)
+                continue
+            if block:
+                block_model.extend(block)
+                block = []
+            if operation != "append":
+                model.remove(job)
+            if operation != "remove":
+                block_model, block = model, [job]
+        if block:
+            block_model.extend(block)
+
+        for model, jobs in edits.items():
+            by_column = {}
+            for job, columns in jobs.values():
+                for column in columns:
+                    by_column.setdefault(column, []).append(job)
+            for column, changed in by_column.items():
+                model.edit(changed, column)
+
+        if memory_changed:
+            main_window.rightBarWidget.update()
+        if label is not None:
+            main_window.slotChangeRunningLabel(label)
+
+
+class Pool(object):
+    def __init__(self):
+        self.model = None  # PoolTableModel showing this pool
+        self._pool = OrderedDict()  # PID -> PCB, in order of arrival
+
+        # Set mutex lock for each pool
         if type(self).__name__ == 'JobPool':
-            self.table_controller = "job_pool_table_control"
             self.lock = JOB_POOL_LOCK
         elif type(self).__name__ == 'ReadyPool':
-            self.table_controller = "ready_table_control"
             self.lock = READY_POOL_LOCK
         elif type(self).__name__ == 'SuspendPool':
-            self.table_controller = "suspend_table_control"
             self.lock = SUSPEND_POOL_LOCK
         elif type(self).__name__ == 'TerminatedPool':
-            self.table_controller = "terminated_table_control"
             self.lock = TERMINATED_POOL_LOCK
 
     def __str__(self):
         print("<{1} Pool ({0})>".format(len(self._pool), type(self).__name__))
-        for job in self._pool:
+        for job in self._pool.values():
             print(job)
         print('')
         return ""
 
     def __repr__(self):
-        return "<PCB Pool ({0})>:{1}".format(len(self._pool), [job for job in self._pool])
+        return "<PCB Pool ({0})>:{1}".format(len(self._pool), list(self._pool.values()))
 
-    def connectSignal(self):
-        self.refreshTableSignal.connect(UI_main_window.slotTableRefresh)
-        self.editTableSignal.connect(UI_main_window.slotTableEdit)
-        self.running_label_change_signal.connect(UI_main_window.slotChangeRunningLabel)
+    def setModel(self, model):
+        """
+        Show pool in a table model
 
+        :param model: PoolTableModel living in GUI thread
+        """
+        self.model = model
+
+    @wakes_schedulers
     @mutex_lock
     def add(self, job):
         """
@@ -145,7 +201,7 @@ class Pool(QtCore.QObject):
         :return: none
         """
         if isinstance(job, PCB):
-            self._pool.append(job)
+            self._pool[job.pid] = job
 
             # Change job's status
             if type(self).__name__ == 'TerminatedPool':
@@ -155,7 +211,7 @@ class Pool(QtCore.QObject):
             elif type(self).__name__ == 'SuspendPool':
                 job.status = 'suspend'
 
-            self.refreshTableSignal.emit(self.table_controller, job, "append")  # Append to table widget
+            update_bus.append(self.model, job)  # Append to table
 
     @property
     @mutex_lock
@@ -174,31 +230,21 @@ class Pool(QtCore.QObject):
         :param pid: PID of item
         :return: An item of specified PID
         """
-        for item in self._pool:
-            if item.pid == int(pid):
-                return item
-        return None
+        return self._pool.get(int(pid))
 
+    @wakes_schedulers
     @mutex_lock
     def remove(self, identifier):
         """
         Remove a job
         :param identifier: job's pid or PCB
-        :return: none
+        :return: removed job, or None if it is not in pool
         """
-        for each in self._pool:
-            if isinstance(identifier, PCB):
-                if each.pid == identifier.pid:
-                    to_return = each
-                    self.refreshTableSignal.emit(self.table_controller, identifier, "remove")
-                    self._pool.remove(each)
-                    return to_return
-            elif isinstance(identifier, int):
-                if each.pid == int(identifier):
-                    to_return = each
-                    self.refreshTableSignal.emit(self.table_controller, self.item(identifier), "remove")
-                    self._pool.remove(each)
-                    return to_return
+        pid = identifier.pid if isinstance(identifier, PCB) else int(identifier)
+        job = self._pool.pop(pid, None)
+        if job is not None:
+            update_bus.remove(self.model, job)
+        return job
 
 
 class JobPool(Pool):
@@ -208,14 +254,14 @@ class JobPool(Pool):
         Get the first job and remove it from job pool
         """
         if self._pool:
-            job = self._pool.pop(0)
-            self.refreshTableSignal.emit("job_pool_table_control", job, "remove")
+            job = self._pool.popitem(last=False)[1]
+            update_bus.remove(self.model, job)
             return job
 
     @mutex_lock
     def get(self):
         if self._pool:
-            return self._pool[0]
+            return next(iter(self._pool.values()))
 
 
 class TerminatedPool(Pool):
@@ -244,25 +290,24 @@ class ReadyPool(Pool):
         :return: a job in pool
         """
         if self.scheduling_mode == 'priority':
-            self._pool = sorted(self._pool, key=lambda item: item.priority)
-        return self._pool[0]
+            for item in sorted(self._pool.values(), key=lambda item: item.priority):
+                self._pool.move_to_end(item.pid)
+        return next(iter(self._pool.values()))
 
-    def minus_time(self, job):
+    def minus_time(self, job, consumed):
         """
-        Minus a job's required_time and sync to table widget
+        Minus a job's required_time and sync to table
 
         :param job: A job to minus its time
+        :param consumed: time job has run, see VirtualClock.time_slice
         :return: none
         """
         job.status = 'ready'
-        if job.required_time >= 40:
-            job.required_time -= 40
-        else:
-            job.required_time = 0
+        job.required_time -= consumed
 
-        # Update table widget
-        self.editTableSignal.emit("ready_table_control", job.pid, 4, str(job.required_time))
-        self.editTableSignal.emit("ready_table_control", job.pid, 2, "ready")
+        # Update table
+        update_bus.edit(self.model, [job], 4)
+        update_bus.edit(self.model, [job], 2)
 
         # Need to be terminated
         if job.required_time == 0:
@@ -270,8 +315,9 @@ class ReadyPool(Pool):
             self.remove(job.pid)  # remove job from waiting list
             memory.free(job.required_memory, job.allocated_memory_start)  # free memory
             terminated_pool.add(job)  # add to terminated pool
+            pid_allocator.release(job.pid)  # PID may be given to a new job
             if len(self._pool) == 0:
-                self.running_label_change_signal.emit("")
+                update_bus.running_label("")
 
     def change_priority(self, job):
         """
@@ -283,18 +329,21 @@ class ReadyPool(Pool):
         job.age = 0
         if job.priority < PRIORITY_MAX:
             job.priority += PRIORITY_ADD_EACH_TERN
-        self.editTableSignal.emit("ready_table_control", job.pid, 3, str(job.priority))
-        self.editTableSignal.emit("ready_table_control", job.pid, 2, "running")
-        self.running_label_change_signal.emit(job.name)
+        update_bus.edit(self.model, [job], 3)
+        update_bus.edit(self.model, [job], 2)
+        update_bus.running_label(job.name)
 
-        # Change other job's age
-        for process in self._pool:
+        # Change other job's age, repaint their priorities at once
+        aged = []
+        for process in self._pool.values():
             if process.pid != job.pid:
                 if process.age < len(AGING_TABLE) - 1:
                     process.age += 1
                 if process.priority - AGING_TABLE[process.age] >= 0:
                     process.priority -= AGING_TABLE[process.age]
-                    self.editTableSignal.emit("ready_table_control", process.pid, 3, str(process.priority))
+                    aged.append(process)
+        if aged:
+            update_bus.edit(self.model, aged, 3)
 
     def suspend(self, job):
         """
@@ -324,134 +373,188 @@ class ReadyPool(Pool):
         return self.max - self.suspended_count
 
 
-class TableController(object):
-    def __init__(self, table, content_each_line):
-        self.table = table
-        self.content_each_line = content_each_line
-        self.table.itemClicked.connect(self.itemClickedSlot)
+class PoolTableModel(QtCore.QAbstractTableModel):
+    """
+    Table model showing the jobs of a pool
 
-        # Set different mutex lock for different QTableWidget
-        if type(self).__name__ == 'JobPoolTableController':
-            self.lock = JOB_POOL_TABLE_LOCK
-        elif type(self).__name__ == 'ReadyTableController':
-            self.lock = READY_TABLE_LOCK
-        elif type(self).__name__ == 'SuspendTableController':
-            self.lock = SUSPEND_TABLE_LOCK
-        elif type(self).__name__ == 'TerminatedTableController':
-            self.lock = TERMINATED_TABLE_LOCK
+    Rows hold the pool's PCBs themselves and cells are read from them when the
+    view paints, so only visible rows cost anything. Added, removed and edited
+    jobs reach the model through the update bus, which keeps every change to
+    the model on the GUI thread.
+    """
+
+    def __init__(self, columns, parent=None):
+        """
+        :param columns: list of (header, PCB attribute) for each column
+        """
+        super().__init__(parent)
+        self.headers = [header for header, _ in columns]
+        self.fields = [field for _, field in columns]
+        self._jobs = []  # PCBs in row order
+        self._rows = {}  # PID -> row, rebuilt on demand after a removal
+        self._stale = False
+        self._edited = {}  # PID -> columns edited, shown highlighted
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._jobs)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        job = self._jobs[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            field = self.fields[index.column()]
+            content = getattr(job, field)
+            if field == 'priority':
+                return "%.2f" % float(content)
+            elif field == 'allocated_memory_start':
+                return hex(content) if content is not None else ""
+            return str(content)
+        elif role == QtCore.Qt.BackgroundRole:
+            if index.column() in self._edited.get(job.pid, ()):
+                return QtGui.QColor(252, 222, 156)
+        return None
+
+    def job(self, row):
+        """
+        :param row: row in table
+        :return: PCB shown in row
+        """
+        return self._jobs[row]
+
+    def _reindex(self):
+        self._rows = {job.pid: row for row, job in enumerate(self._jobs)}
+        self._stale = False
+
+    def _row_of(self, job):
+        if not self._stale:
+            return self._rows.get(job.pid)
+        try:
+            return self._jobs.index(job)  # Cheap for the front rows a job pool pops
+        except ValueError:
+            return None
 
-    @mutex_lock
     def append(self, process):
         """
-        Append a row to table widget
+        Append a row for process
 
-        :param process: process to append to widget
+        :param process: process to append to table
         :return: none
         """
-        self.table.setRowCount(self.table.rowCount() + 1)
-        for j in range(0, len(self.content_each_line)):
-            content = eval('process.' + self.content_each_line[j])
-            if j == 3:
-                # Special for priority column
-                item = QTableWidgetItem(str("%.2f" % float(content)))
-            elif j == 7:
-                item = QTableWidgetItem(str(hex(content)))
-            else:
-                item = QTableWidgetItem(str(content))
-            self.table.setItem(self.table.rowCount() - 1, j, item)  # Add item to table
-            self.table.scrollToItem(item)  # Scroll to item
+        row = len(self._jobs)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._jobs.append(process)
+        if not self._stale:
+            self._rows[process.pid] = row
+        self.endInsertRows()
 
-    @mutex_lock
-    def remove(self, process):
+    def extend(self, processes):
         """
-        Remove a row in table widget
+        Append a block of rows
 
-        :param process: process to remove from table widget
+        :param processes: processes to append to table
         :return: none
         """
-        for i in range(0, self.table.rowCount()):
-            if self.table.item(i, 0).text() == str(process.pid):
-                # Move rows after me
-                if i < self.table.rowCount() - 1:
-                    for j in range(i, self.table.rowCount() - 1):
-                        for k in range(0, len(self.content_each_line)):
-                            self.table.setItem(j, k, QTableWidgetItem(self.table.item(j + 1, k).text()))
-                break
+        first = len(self._jobs)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(processes) - 1)
+        self._jobs.extend(processes)
+        if not self._stale:
+            for row, process in enumerate(processes, first):
+                self._rows[process.pid] = row
+        self.endInsertRows()
 
-        self.table.setRowCount(self.table.rowCount() - 1)  # row count - 1
-
-    @mutex_lock
-    def edit(self, process_id, column, new_text):
+    def remove(self, process):
         """
-        Edit a item and change its background color to yellow
+        Remove the row of process
 
-        :param process_id: PID of process
-        :param column: column to edit
-        :param new_text: new text of QTableWidgetItem
+        :param process: process to remove from table
         :return: none
         """
+        row = self._row_of(process)
+        if row is None:
+            return
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        del self._jobs[row]
+        self._rows.pop(process.pid, None)
+        self._edited.pop(process.pid, None)
+        self._stale = self._stale or row < len(self._jobs)  # Rows after it moved up
+        self.endRemoveRows()
 
-        for i in range(0, self.table.rowCount()):
-            if self.table.item(i, 0).text() == str(process_id):
-                if column == 3:
-                    new_text = "%.2f" % float(new_text)
-                new_item = QTableWidgetItem(new_text)
-                new_item.setBackground(QtGui.QColor(252, 222, 156))
-                self.table.setItem(i, column, new_item)
+    def edit(self, processes, column):
+        """
+        Highlight a column of some processes and repaint it
 
-    def itemClickedSlot(self, item):
+        :param processes: processes whose column changed
+        :param column: column that changed
+        :return: none
         """
-        Slot for suspending and resuming process
+        if self._stale:
+            self._reindex()
+        rows = []
+        for process in processes:
+            row = self._rows.get(process.pid)
+            if row is not None:
+                self._edited.setdefault(process.pid, set()).add(column)
+                rows.append(row)
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), column), self.index(max(rows), column))
 
-        :param item: QTableWidgetItem clicked
+    def clickedSlot(self, index):
         """
-        if type(self).__name__ == 'ReadyTableController':
-            if item.column() == 0 and self.table.item(item.row(), 2).text() == "ready":
-                print("Suspend %s" % self.table.item(item.row(), 0).text())
-                process = ready_pool.item(self.table.item(item.row(), 0).text())
-                print(process)
-                ready_pool.suspend(process)
-                suspend_pool.add(process)
-        elif type(self).__name__ == 'SuspendTableController':
-            if item.column() == 0:
-                print("Resume %s" % self.table.item(item.row(), 0).text())
-                process = suspend_pool.item(self.table.item(item.row(), 0).text())
-                suspend_pool.remove(process)
-                ready_pool.resume(process)
+        Slot for a click on the table view
+
+        :param index: QModelIndex clicked
+        """
+        pass
 
 
-class JobPoolTableController(TableController):
+class JobPoolTableModel(PoolTableModel):
     pass
 
 
-class ReadyTableController(TableController):
-    pass
+class ReadyTableModel(PoolTableModel):
+    def clickedSlot(self, index):
+        # Suspend a waiting process
+        if index.column() == 0 and self.job(index.row()).status == "ready":
+            process = ready_pool.item(self.job(index.row()).pid)
+            if process is not None:
+                print("Suspend %s" % process.pid)
+                print(process)
+                ready_pool.suspend(process)
+                suspend_pool.add(process)
 
 
-class SuspendTableController(TableController):
-    pass
+class SuspendTableModel(PoolTableModel):
+    def clickedSlot(self, index):
+        # Resume a suspended process
+        if index.column() == 0:
+            process = suspend_pool.item(self.job(index.row()).pid)
+            if process is not None:
+                print("Resume %s" % process.pid)
+                suspend_pool.remove(process)
+                ready_pool.resume(process)
 
 
-class TerminatedTableController(TableController):
+class TerminatedTableModel(PoolTableModel):
     pass
 
 
-class Memory(QtCore.QObject):
-    memory_edit_signal = QtCore.pyqtSignal("QString", int)
-
-    def __init__(self, table):
-        super().__init__()
-        self.table = table
+class Memory(object):
+    def __init__(self, widget, backend=MEMORY_BACKEND):
         self.lock = threading.Lock()
-        self.free_mem = [{"start": 0, "length": TOTAL_MEM}]
-        self.memory_edit_signal.connect(UI_main_window.slotMemoryTableEdit)
-
-        # Init table widget
-        for i in range(0, TOTAL_MEM):
-            self.table.setRowCount(self.table.rowCount() + 1)
-            item = QTableWidgetItem(" ")
-            item.setBackground(COLOR_MEMORY)
-            self.table.setItem(self.table.rowCount() - 1, 0, item)
+        self.allocator = make_memory(backend, TOTAL_MEM)
+        self.total = TOTAL_MEM
+        self.freed_count = 0  # Times memory has been freed, lets waiters notice a change
+        self.widget = widget
+        self.widget.setMemory(self)
 
     @mutex_lock
     def allocate(self, mem_need):
@@ -460,19 +563,12 @@ class Memory(QtCore.QObject):
 
         :return: Starting address or "Failure"
         """
-        for each_free_mem in self.free_mem:
-            if each_free_mem["length"] >= mem_need:
-                # Edit table widget
-                for each_location in range(each_free_mem["start"], each_free_mem["start"] + mem_need):
-                    self._edit_table_widget("allocate", each_location)
-
-                each_free_mem["length"] -= mem_need
-                each_free_mem["start"] += mem_need
-                if each_free_mem["length"] == 0:
-                    self.free_mem.remove(each_free_mem)
-                return each_free_mem["start"] - mem_need
-        return "Failure"
+        start = self.allocator.allocate(mem_need)
+        if start != "Failure":
+            update_bus.memory()  # Repaint right bar
+        return start
 
+    @wakes_schedulers
     @mutex_lock
     def free(self, mem_length, mem_start):
         """
@@ -480,24 +576,16 @@ class Memory(QtCore.QObject):
 
         :return: None
         """
-        # Free memory on right bar
-        for each_location in range(mem_start, mem_start + mem_length):
-            self._edit_table_widget("free", each_location)
-        # Free memory in free_mem list
-        self.free_mem.append({"start": mem_start, "length": mem_length})
-        while True:
-            if_combined = False
-            for mem1 in self.free_mem:
-                for mem2 in self.free_mem:
-                    if mem1["start"] + mem1["length"] == mem2["start"]:
-                        mem1["length"] += mem2["length"]
-                        self.free_mem.remove(mem2)
-                        if_combined = True
-            if not if_combined:
-                break
+        self.freed_count += 1
+        self.allocator.free(mem_length, mem_start)
+        update_bus.memory()  # Repaint right bar
 
-    def _edit_table_widget(self, operation, location):
-        self.memory_edit_signal.emit(operation, location)
+    @mutex_lock
+    def free_extents(self):
+        """
+        :return: list of (start, length) of holes in address order
+        """
+        return self.allocator.free_extents()
 
 
 class MainWindow(QMainWindow, mainwindow.Ui_MainWindow):
@@ -505,6 +593,38 @@ class MainWindow(QMainWindow, mainwindow.Ui_MainWindow):
         super().__init__()
         self.setupUi(self)
 
+        # Table models, rows are filled in by pools
+        self.job_pool_model = JobPoolTableModel([('PID', 'pid'),
+                                                 ('作业名称', 'name'),
+                                                 ('状态', 'status'),
+                                                 ('优先权', 'priority'),
+                                                 ('要求运行时间', 'required_time'),
+                                                 ('所需内存', 'required_memory')], self)
+        self.ready_model = ReadyTableModel([('PID', 'pid'),
+                                            ('作业名称', 'name'),
+                                            ('状态', 'status'),
+                                            ('优先权', 'priority'),
+                                            ('要求运行时间', 'required_time'),
+                                            ('PCB指针', 'address'),
+                                            ('所需内存', 'required_memory'),
+                                            ('内存首地址', 'allocated_memory_start')], self)
+        self.suspend_model = SuspendTableModel([('PID', 'pid'),
+                                                ('作业名称', 'name'),
+                                                ('状态', 'status'),
+                                                ('优先权', 'priority'),
+                                                ('要求运行时间', 'required_time'),
+                                                ('PCB指针', 'address'),
+                                                ('所需内存', 'required_memory'),
+                                                ('内存首地址', 'allocated_memory_start')], self)
+        self.terminated_model = TerminatedTableModel([('PID', 'pid'), ('作业名称', 'name')], self)
+        for table, model in ((self.JobPoolTable, self.job_pool_model),
+                             (self.ReadyTable, self.ready_model),
+                             (self.SuspendTable, self.suspend_model),
+                             (self.TerminatedTable, self.terminated_model)):
+            table.setModel(model)
+            table.clicked.connect(model.clickedSlot)
+            model.rowsInserted.connect(table.scrollToBottom)
+
         # Set table width
         self.JobPoolTable.setColumnWidth(0, 50)
         self.ReadyTable.setColumnWidth(0, 50)
@@ -513,8 +633,6 @@ class MainWindow(QMainWindow, mainwindow.Ui_MainWindow):
 
         # Settings for right bar
         self.setFixedWidth(1100)  # hide bar on the right
-        self.rightBarWidget.setShowGrid(False)
-        self.rightBarWidget.verticalHeader().setDefaultSectionSize(5)
 
         # Stretch last column of the table
         self.TerminatedTable.horizontalHeader().setStretchLastSection(True)
@@ -527,6 +645,19 @@ class MainWindow(QMainWindow, mainwindow.Ui_MainWindow):
         self.AddJobButton.clicked.connect(self.slotAddJobButton)
         self.DaoshuBox.valueChanged.connect(self.slotMaxWaitingChanged)
 
+        # Clock controls
+        for speed in SPEEDS:
+            self.SpeedBox.addItem("最快" if speed is None else "{0:g}×".format(speed))
+        self.SpeedBox.setCurrentIndex(SPEEDS.index(SPEED))
+        self.QuantumBox.setValue(QUANTUM)
+        self.SpeedBox.currentIndexChanged.connect(self.slotSpeedChanged)
+        self.QuantumBox.valueChanged.connect(self.slotQuantumChanged)
+
+        # Show what changed once a frame
+        self.update_timer = QtCore.QTimer(self)
+        self.update_timer.timeout.connect(self.slotFlushUpdates)
+        self.update_timer.start(UI_FRAME_INTERVAL)
+
     def slotStartButton(self):
         ready_pool.max = self.DaoshuBox.value()
         self.StartButton.setDisabled(True)
@@ -549,11 +680,20 @@ class MainWindow(QMainWindow, mainwindow.Ui_MainWindow):
 
     def slotGenerateJobButton(self):
         for i in range(self.RandomCountBox.value()):
-            random_process = PCB.random()
+            try:
+                random_process = PCB.random()
+            except RuntimeError as e:
+                self.statusbar.showMessage(str(e), STATUS_MESSAGE_TIME)  # Out of PIDs
+                break
             job_pool.add(random_process)
 
     def slotAddJobButton(self):
-        job_pool.add(PCB(PCB.generate_pid(),
+        try:
+            pid = PCB.generate_pid()
+        except RuntimeError as e:
+            self.statusbar.showMessage(str(e), STATUS_MESSAGE_TIME)  # Out of PIDs
+            return
+        job_pool.add(PCB(pid,
                          self.AddJobNameEdit.text(),
                          int(self.AddJobPriorityEdit.text()),
                          int(self.AddJobTimeEdit.text())
@@ -561,25 +701,17 @@ class MainWindow(QMainWindow, mainwindow.Ui_MainWindow):
 
     def slotMaxWaitingChanged(self):
         ready_pool.max = self.DaoshuBox.value()
+        wake_schedulers()
 
-    @QtCore.pyqtSlot("QString", PCB, "QString")
-    def slotTableRefresh(self, controller_name, process, operation):
-        if operation == "append":
-            eval(controller_name + ".append(process)")
-        elif operation == "remove":
-            eval(controller_name + ".remove(process)")
+    def slotSpeedChanged(self, index):
+        clock.speed = SPEEDS[index]
 
-    @QtCore.pyqtSlot("QString", int, int, "QString")
-    def slotTableEdit(self, controller_name, pid, column, new_text):
-        eval(controller_name + ".edit(pid, column, new_text)")
+    def slotQuantumChanged(self):
+        clock.quantum = self.QuantumBox.value()
 
-    @QtCore.pyqtSlot("QString", int)
-    def slotMemoryTableEdit(self, operation, location):
-        print(operation, location)
-        memory.table.item(location, 0).setBackground(
-            COLOR_USED_MEMORY if operation == "allocate" else COLOR_MEMORY)
+    def slotFlushUpdates(self):
+        update_bus.flush(self)
 
-    @QtCore.pyqtSlot("QString")
     def slotChangeRunningLabel(self, process_name):
         if process_name:
             self.NowRunningLabel.setText("Running %s" % process_name)
@@ -595,16 +727,18 @@ def short_term_scheduling_thread(mode, ready_pl):
     :param ready_pl: ready pool
     """
     while True:
-        if ready_pl.num > 0:
-            processing_job = ready_pl.get()
-            processing_job.status = 'running'
-            if mode == 'priority':
-                print('Running {0}...'.format(processing_job.name))
-                ready_pl.change_priority(processing_job)
-                time.sleep(CPU_PROCESS_TIME)  # Sleep just for show
-                ready_pl.minus_time(processing_job)
+        # Sleep until there is something to run
+        with SCHEDULER_CONDITION:
+            SCHEDULER_CONDITION.wait_for(lambda: ready_pl.num > 0)
 
-        time.sleep(0.001)
+        processing_job = ready_pl.get()
+        processing_job.status = 'running'
+        if mode == 'priority':
+            print('Running {0}...'.format(processing_job.name))
+            ready_pl.change_priority(processing_job)
+            time_slice = clock.time_slice(processing_job.required_time)
+            clock.advance(time_slice)  # Waits only as long as the speed asks for
+            ready_pl.minus_time(processing_job, time_slice)
 
 
 def long_term_scheduling_thread(mode, ready_pl, job_pl):
@@ -615,17 +749,32 @@ def long_term_scheduling_thread(mode, ready_pl, job_pl):
     :param ready_pl: ready pool object
     :param job_pl: job pool object
     """
+    failures = 0  # Jobs in a row that did not fit in memory
+    freed_count = memory.freed_count
     while True:
-        if ready_pl.num < ready_pl.count:
-            job = job_pl.pop()
-            if job:
-                mem = memory.allocate(job.required_memory)
-                if mem == "Failure":
-                    job_pl.add(job)
-                else:
-                    ready_pl.add(job)
-                    job.allocated_memory_start = mem
-        time.sleep(0.001)
+        # Sleep until there is a job to move and room for it
+        with SCHEDULER_CONDITION:
+            SCHEDULER_CONDITION.wait_for(lambda: job_pl.num > 0 and ready_pl.num < ready_pl.count)
+
+        if failures == 0:
+            freed_count = memory.freed_count
+        job = job_pl.pop()
+        if job:
+            mem = memory.allocate(job.required_memory)
+            if mem == "Failure":
+                job_pl.add(job)
+                failures += 1
+                if failures >= job_pl.num:
+                    # No waiting job fits, sleep until memory is freed or a new job comes
+                    job_count = job_pl.num
+                    with SCHEDULER_CONDITION:
+                        SCHEDULER_CONDITION.wait_for(lambda: memory.freed_count != freed_count or
+                                                             job_pl.num != job_count)
+                    failures = 0
+            else:
+                ready_pl.add(job)
+                job.allocated_memory_start = mem
+                failures = 0
 
 
 if __name__ == '__main__':
@@ -633,44 +782,12 @@ if __name__ == '__main__':
     UI_main_window = MainWindow()
 
     JOB_POOL_LOCK = threading.Lock()
-    JOB_POOL_TABLE_LOCK = threading.Lock()
     READY_POOL_LOCK = threading.Lock()
-    READY_TABLE_LOCK = threading.Lock()
     SUSPEND_POOL_LOCK = threading.Lock()
-    SUSPEND_TABLE_LOCK = threading.Lock()
     TERMINATED_POOL_LOCK = threading.Lock()
-    TERMINATED_TABLE_LOCK = threading.Lock()
-
-    used_PIDs = set()
-
-    # Create table controller
-    job_pool_table_control = JobPoolTableController(table=UI_main_window.JobPoolTable,
-                                                    content_each_line=['pid',
-                                                                       'name',
-                                                                       'status',
-                                                                       'priority',
-                                                                       'required_time',
-                                                                       'required_memory'])
-    ready_table_control = ReadyTableController(table=UI_main_window.ReadyTable,
-                                               content_each_line=['pid',
-                                                                  'name',
-                                                                  'status',
-                                                                  'priority',
-                                                                  'required_time',
-                                                                  'address',
-                                                                  'required_memory',
-                                                                  'allocated_memory_start'])
-    suspend_table_control = SuspendTableController(table=UI_main_window.SuspendTable,
-                                                   content_each_line=['pid',
-                                                                      'name',
-                                                                      'status',
-                                                                      'priority',
-                                                                      'required_time',
-                                                                      'address',
-                                                                      'required_memory',
-                                                                      'allocated_memory_start'])
-    terminated_table_control = TerminatedTableController(table=UI_main_window.TerminatedTable,
-                                                         content_each_line=['pid', 'name'])
+    SCHEDULER_CONDITION = threading.Condition()  # Notified whenever pools or memory change
+    update_bus = UpdateBus()
+    clock = VirtualClock(quantum=QUANTUM, speed=SPEED, seconds_per_quantum=CPU_PROCESS_TIME)
 
     # Create pool instances and memory
     job_pool = JobPool()
@@ -679,11 +796,11 @@ if __name__ == '__main__':
     suspend_pool = SuspendPool()
     memory = Memory(UI_main_window.rightBarWidget)
 
-    # Connect signals
-    job_pool.connectSignal()
-    ready_pool.connectSignal()
-    terminated_pool.connectSignal()
-    suspend_pool.connectSignal()
+    # Show pools in tables
+    job_pool.setModel(UI_main_window.job_pool_model)
+    ready_pool.setModel(UI_main_window.ready_model)
+    terminated_pool.setModel(UI_main_window.terminated_model)
+    suspend_pool.setModel(UI_main_window.suspend_model)
 
     # Show main window
     UI_main_window.show()
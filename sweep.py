@@ -0,0 +1,166 @@
+"""
+Parameter sweeps
+
+Runs headless simulations over a grid or a random sample of scheduler knobs
+and workload seeds, on all cores, and appends one JSON line of metrics per run
+to a results file as soon as the run finishes. Every run is seeded, so the
+same task always gives the same result; a task already in the results file is
+skipped, so an interrupted sweep picks up where it stopped when run again.
+
+A spec is a JSON file like
+
+    {
+      "grid": {"quantum": [20, 40, 80], "aging_scale": [0.5, 1, 2]},
+      "fixed": {"jobs": 1000, "mode": "priority"},
+      "seeds": [1, 2, 3]
+    }
+
+or, for random search, "random" instead of "grid" plus "samples" and
+"search_seed". In "random", a list is a set of choices and {"low": .., "high": ..}
+a range (ints if both ends are ints). Knobs are listed in DEFAULTS, except seed,
+which only goes in "seeds".
+
+    python sweep.py spec.json --out results.jsonl
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from allocators import make_memory
+from engine import (Engine, random_job, PRIORITY_ADD_EACH_TERN, PRIORITY_MAX, AGING_TABLE, QUANTUM, READY_MAX,
+                    TOTAL_MEM, MEMORY_BACKEND)
+from metrics import MetricsCollector
+from policies import make_ready_pool
+
+DEFAULTS = {
+    'mode': 'priority',
+    'memory': MEMORY_BACKEND,
+    'jobs': 1000,
+    'arrival_gap': 0,  # Virtual time between arrivals, 0 for all at once like the GUI button
+    'priority_add': PRIORITY_ADD_EACH_TERN,
+    'priority_max': PRIORITY_MAX,
+    'aging_table': AGING_TABLE,
+    'aging_scale': 1,  # Multiplies every entry of aging_table
+    'quantum': QUANTUM,
+    'ready_max': READY_MAX,
+    'total_mem': TOTAL_MEM,
+    'seed': 0,
+}
+
+
+def task_key(params):
+    """
+    :return: string identifying a task, the same for the same parameters
+    """
+    return json.dumps(params, sort_keys=True)
+
+
+def run_task(params):
+    """
+    Run one simulation
+
+    :param params: knobs, missing ones take DEFAULTS
+    :return: dict of task key, parameters, metrics summary and wall time
+    """
+    knobs = dict(DEFAULTS, **params)
+    random.seed(knobs['seed'])
+    ready_pool = make_ready_pool(knobs['mode'], max=knobs['ready_max'], priority_add=knobs['priority_add'],
+                                 priority_max=knobs['priority_max'], quantum=knobs['quantum'],
+                                 aging_table=[step * knobs['aging_scale'] for step in knobs['aging_table']])
+    engine = Engine(ready_pool=ready_pool, memory=make_memory(knobs['memory'], knobs['total_mem']))
+    collector = MetricsCollector(engine)
+    for pid in range(1, knobs['jobs'] + 1):
+        engine.submit(random_job(pid), at=(pid - 1) * knobs['arrival_gap'])
+    started = time.perf_counter()
+    engine.run()
+    return {'task': task_key(params), 'params': params, 'metrics': collector.summary(),
+            'wall': time.perf_counter() - started}
+
+
+def _draw(rng, choice):
+    if isinstance(choice, dict):
+        low, high = choice['low'], choice['high']
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return rng.uniform(low, high)
+    return rng.choice(choice)
+
+
+def tasks(spec):
+    """
+    :param spec: sweep spec, see module docstring
+    :return: list of parameter dicts, one per run, in a fixed order
+    """
+    fixed = spec.get('fixed', {})
+    seeds = spec.get('seeds', [DEFAULTS['seed']])
+    unknown = set(fixed) | set(spec.get('grid', {})) | set(spec.get('random', {}))
+    unknown -= set(DEFAULTS)
+    if unknown:
+        raise ValueError("Unknown knobs {0}, choose from {1}".format(", ".join(sorted(unknown)),
+                                                                     ", ".join(sorted(DEFAULTS))))
+    if 'seed' in fixed or 'seed' in spec.get('grid', {}) or 'seed' in spec.get('random', {}):
+        raise ValueError("Give workload seeds as \"seeds\", not as a knob")
+    if 'random' in spec:
+        rng = random.Random(spec.get('search_seed', 0))
+        points = [{name: _draw(rng, choice) for name, choice in sorted(spec['random'].items())}
+                  for _ in range(spec.get('samples', 10))]
+    else:
+        grid = spec.get('grid', {})
+        names = sorted(grid)
+        points = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    return [{**fixed, **point, 'seed': seed} for point in points for seed in seeds]
+
+
+def done_tasks(path):
+    """
+    :return: set of task keys already in a results file
+    """
+    done = set()
+    if os.path.exists(path):
+        with open(path) as results:
+            for line in results:
+                try:
+                    done.add(json.loads(line)['task'])
+                except (ValueError, KeyError):
+                    pass  # Line cut short when a sweep was killed
+    return done
+
+
+def sweep(spec, path, processes=None):
+    """
+    Run every task of spec not yet in path, appending results as they finish
+
+    :param spec: sweep spec
+    :param path: JSON Lines results file
+    :param processes: worker processes, all cores by default
+    :return: number of runs done this time
+    """
+    done = done_tasks(path)
+    todo = [params for params in tasks(spec) if task_key(params) not in done]
+    if not todo:
+        return 0
+    with multiprocessing.Pool(processes) as pool, open(path, 'a+') as results:
+        if results.tell():
+            results.seek(results.tell() - 1)
+            if results.read(1) != "\n":
+                results.write("\n")  # Start after a line cut short
+        for count, result in enumerate(pool.imap_unordered(run_task, todo), 1):
+            results.write(json.dumps(result) + "\n")
+            results.flush()
+            print("{0}/{1} {2} {3:.2f}s".format(count, len(todo), result['task'], result['wall']))
+    return len(todo)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep scheduler parameters over headless runs")
+    parser.add_argument("spec", help="JSON sweep spec")
+    parser.add_argument("--out", default="sweep_results.jsonl", help="JSON Lines results file, appended to")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, all cores by default")
+    args = parser.parse_args()
+
+    with open(args.spec) as spec_file:
+        spec = json.load(spec_file)
+    print("{0} runs done".format(sweep(spec, args.out, args.processes)))
@@ -0,0 +1,165 @@
+"""
+Workload traces
+
+read_trace streams jobs from a CSV or JSON Lines file one row at a time, and
+TraceReplay feeds them into an engine's job pool as its virtual clock reaches
+each arrival. Neither ever holds more than one row of the file in memory.
+
+Columns (CSV header or JSON keys): arrival, priority, burst and memory, plus
+optional pid and name. arrival_time, required_time and required_memory are
+accepted as well. A row with a negative burst or memory below 1 is an error.
+"""
+import csv
+import json
+from pcb import PCB
+
+FIELDS = {
+    'arrival': ('arrival', 'arrival_time'),
+    'priority': ('priority',),
+    'burst': ('burst', 'required_time'),
+    'memory': ('memory', 'required_memory'),
+    'pid': ('pid',),
+    'name': ('name',),
+}
+HIGH_WATER = 10000  # Default max jobs waiting in job pool before reading stops
+
+
+class TraceRecord(object):
+    __slots__ = ('arrival', 'priority', 'burst', 'memory', 'pid', 'name')
+
+    def __init__(self, arrival, priority, burst, memory, pid=None, name=None):
+        self.arrival = arrival
+        self.priority = priority
+        self.burst = burst
+        self.memory = memory
+        self.pid = pid
+        self.name = name
+
+    def __repr__(self):
+        return "<TraceRecord arrival:{0} priority:{1} burst:{2} memory:{3}>".format(
+            self.arrival, self.priority, self.burst, self.memory)
+
+
+def _record(row, line):
+    values = {}
+    for field, names in FIELDS.items():
+        for name in names:
+            value = row.get(name)
+            if value not in (None, ''):
+                values[field] = value
+                break
+    try:
+        record = TraceRecord(int(float(values['arrival'])),
+                             float(values.get('priority', 1)),
+                             int(float(values['burst'])),
+                             int(float(values['memory'])),
+                             int(values['pid']) if 'pid' in values else None,
+                             values.get('name'))
+    except KeyError as e:
+        raise ValueError("Line {0} of trace has no {1}".format(line, e.args[0]))
+    if record.burst < 0:
+        raise ValueError("Line {0} of trace has negative burst {1}".format(line, record.burst))
+    if record.memory < 1:
+        raise ValueError("Line {0} of trace needs {1} memory, at least 1".format(line, record.memory))
+    return record
+
+
+def read_trace(path, format=None):
+    """
+    Stream records of a trace file
+
+    :param path: file to read
+    :param format: 'csv' or 'jsonl', guessed from the file name if None
+    :return: generator of TraceRecord, in file order
+    """
+    if format is None:
+        format = 'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv'
+    with open(path, newline='') as file:
+        if format == 'csv':
+            for line, row in enumerate(csv.DictReader(file), 2):
+                yield _record(row, line)
+        elif format == 'jsonl':
+            for line, text in enumerate(file, 1):
+                if text.strip():
+                    yield _record(json.loads(text), line)
+        else:
+            raise ValueError("Unknown trace format {0!r}, choose from csv, jsonl".format(format))
+
+
+class TraceReplay(object):
+    """
+    Replays trace records into an engine
+
+    Only the next record is ever scheduled, as one event at its arrival time.
+    When the job pool holds high_water jobs, reading stops until admission
+    takes it below again; the held back jobs then arrive late, at the time
+    they are let in. A record whose PID belongs to a job still in the system
+    gets a fresh PID instead, as pools are keyed by PID.
+    """
+
+    def __init__(self, engine, records, high_water=HIGH_WATER, make_pcb=PCB, first_pid=1):
+        """
+        :param engine: engine.Engine to feed
+        :param records: iterable of TraceRecord, ordered by arrival
+        :param high_water: max jobs waiting in job pool
+        :param make_pcb: PCB, CompactPCB or a PCBTable's new
+        :param first_pid: PID of first record without one, counts up from there
+        """
+        self.engine = engine
+        self.records = iter(records)
+        self.high_water = high_water
+        self.make_pcb = make_pcb
+        self.next_pid = first_pid
+        self.replayed = 0
+        self.remapped = 0  # Records given another PID than their own
+        self._live = set()  # PIDs of replayed jobs not yet terminated
+        self.held = False  # Stopped by high water mark
+        self.finished = False
+        engine.subscribe(self._observe)
+
+    def start(self):
+        """
+        Schedule the first arrival
+        """
+        self._feed()
+
+    def _job(self, record):
+        pid = record.pid
+        if pid is None or pid in self._live:
+            if pid is not None:
+                self.remapped += 1
+            while self.next_pid in self._live:
+                self.next_pid += 1
+            pid = self.next_pid
+            self.next_pid += 1
+        self._live.add(pid)
+        job = self.make_pcb(pid, record.name or None, record.priority, record.burst, record.memory)
+        # The constructor turns 0 into a default, a trace means what it says
+        job.priority = record.priority
+        job.required_time = record.burst
+        job.required_memory = record.memory
+        return job
+
+    def _feed(self):
+        engine = self.engine
+        if engine.job_pool.num >= self.high_water:
+            self.held = True
+            return
+        record = next(self.records, None)
+        if record is None:
+            self.finished = True
+            return
+        engine.schedule(max(record.arrival, engine.now), self._arrive, self._job(record))
+
+    def _arrive(self, job):
+        self.engine._arrive(job)
+        self.replayed += 1
+        self._feed()
+
+    def _observe(self, event, now, job):
+        if event == 'terminate':
+            self._live.discard(job.pid)
+        elif event == 'admit' and self.held and self.engine.job_pool.num < self.high_water:
+            self.held = False
+            # Feed from the event queue, not from inside long term scheduling
+            self.engine.schedule(now, self._feed)
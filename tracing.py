@@ -0,0 +1,248 @@
+"""
+Binary event tracing
+
+EventTracer subscribes to an engine and records every dispatch, preemption,
+priority change, suspend, resume, memory allocation and free, and
+termination as a fixed-size binary record, packed straight into a
+preallocated buffer. With a path, full buffers are appended to a file; with
+ring=N only the last N records are kept in memory, and save writes them out.
+Priority changes are seen when a job next appears in an event and are
+recorded just before it, so aging of a waiting job and the priority a job
+is given when it runs show up right before its dispatch record.
+
+export_chrome turns a trace file into Chrome trace event JSON, one event at
+a time, which chrome://tracing and https://ui.perfetto.dev open: a track per
+CPU with a slice per time slice, instants for the other events and a memory
+counter. A unit of virtual time is shown as a microsecond.
+
+    python engine.py 100000 --event-trace run.trace
+    python tracing.py run.trace --chrome run.json
+"""
+import argparse
+import json
+import struct
+
+MAGIC = b'SIMTRACE'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHH4x')  # magic, version, record size
+RECORD = struct.Struct('<qqdqqBB6x')  # time, pid, priority, a, b, event, core
+EVENTS = ('arrive', 'dispatch', 'preempt', 'priority', 'suspend', 'resume', 'allocate', 'free', 'terminate',
+          'migrate')
+ARRIVE, DISPATCH, PREEMPT, PRIORITY, SUSPEND, RESUME, ALLOCATE, FREE, TERMINATE, MIGRATE = range(len(EVENTS))
+CODES = {event: code for code, event in enumerate(EVENTS)}
+_pack_into, _RECORD_SIZE = RECORD.pack_into, RECORD.size
+BUFFER_RECORDS = 8192  # Records held before a write to file
+READ_RECORDS = 65536  # Records read at a time
+
+
+class EventTracer(object):
+    """
+    Engine observer writing fixed-size event records
+
+    a and b of a record are the job's remaining required_time and 0, except
+    for allocate and free where they are the start and length of the memory.
+    """
+    checkpointed = False  # Left out of checkpoints, see checkpoint.py
+
+    def __init__(self, engine, path=None, ring=None, buffer_records=BUFFER_RECORDS):
+        """
+        :param engine: engine.Engine or multicore.MultiCoreEngine to trace
+        :param path: file to append records to
+        :param ring: instead of a file, keep the last ring records in memory
+        :param buffer_records: records buffered before a write to file
+        """
+        if (path is None) == (ring is None):
+            raise ValueError("Give a path or a ring size")
+        self.engine = engine
+        self.ring = ring
+        self.count = 0  # Records made, including ones a ring has dropped
+        self._core_of = getattr(engine, 'core_of', None)
+        self._priority = {}  # pid -> priority last recorded, for jobs in the system
+        self._offset = 0
+        if ring is None:
+            self._file = open(path, 'wb')
+            self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size))
+            self._buffer = bytearray(RECORD.size * buffer_records)
+        else:
+            self._file = None
+            self._buffer = bytearray(RECORD.size * ring)
+        self._end = len(self._buffer)
+        engine.subscribe(self)
+
+    def _record(self, event, now, pid, core, priority, a, b):
+        offset = self._offset
+        _pack_into(self._buffer, offset, now, pid, priority, a, b, event, core)
+        offset += _RECORD_SIZE
+        self.count += 1
+        if offset == self._end:
+            if self._file is None:
+                offset = 0  # Ring wraps, oldest records are overwritten
+            else:
+                self._offset = offset
+                self.flush()
+                return
+        self._offset = offset
+
+    def __call__(self, event, now, job):
+        pid, priority, remaining = job.pid, job.priority, job.required_time
+        core = 0
+        if self._core_of is not None:
+            queued_on = self._core_of(job)
+            if queued_on is not None:
+                core = queued_on.index
+
+        priorities = self._priority
+        last = priorities.get(pid)
+        changed = last != priority
+        if changed:
+            priorities[pid] = priority
+            changed = last is not None
+
+        offset = self._offset
+        if (event == 'dispatch' or event == 'preempt') and offset + 2 * _RECORD_SIZE < self._end:
+            # Most records are these, so _record is inlined while the buffer is not about to fill
+            buffer = self._buffer
+            if changed:
+                _pack_into(buffer, offset, now, pid, priority, remaining, 0, PRIORITY, core)
+                offset += _RECORD_SIZE
+                self.count += 1
+            _pack_into(buffer, offset, now, pid, priority, remaining, 0, DISPATCH if event == 'dispatch' else PREEMPT,
+                       core)
+            self._offset = offset + _RECORD_SIZE
+            self.count += 1
+            return
+
+        if changed:
+            self._record(PRIORITY, now, pid, core, priority, remaining, 0)
+        if event == 'admit':
+            self._record(ALLOCATE, now, pid, core, priority, job.allocated_memory_start, job.required_memory)
+        elif event == 'terminate':
+            del priorities[pid]
+            self._record(FREE, now, pid, core, priority, job.allocated_memory_start, job.required_memory)
+            self._record(TERMINATE, now, pid, core, priority, remaining, 0)
+        else:
+            code = CODES.get(event)
+            if code is not None:
+                self._record(code, now, pid, core, priority, remaining, 0)
+
+    def flush(self):
+        """
+        Write buffered records to file
+        """
+        if self._file is not None:
+            self._file.write(memoryview(self._buffer)[:self._offset])
+            self._file.flush()
+            self._offset = 0
+
+    def close(self):
+        """
+        Flush and close the file, if any
+        """
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def save(self, path):
+        """
+        Write a ring's records, oldest first, as a trace file
+
+        :param path: file to write
+        """
+        records = memoryview(self._buffer)
+        with open(path, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size))
+            if self._file is None and self.count >= self.ring:
+                out.write(records[self._offset:])
+            out.write(records[:self._offset])
+
+
+def read_events(path):
+    """
+    Stream records of a trace file
+
+    :param path: file written by EventTracer
+    :return: generator of (time, event, pid, core, priority, a, b), event as a name from EVENTS
+    """
+    with open(path, 'rb') as trace:
+        header = trace.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("{0} is not an event trace".format(path))
+        magic, version, record_size = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("{0} is not an event trace".format(path))
+        if version > FORMAT_VERSION or record_size != RECORD.size:
+            raise ValueError("{0} is format version {1}, this reads up to {2}".format(path, version, FORMAT_VERSION))
+        while True:
+            chunk = trace.read(RECORD.size * READ_RECORDS)
+            chunk = chunk[:len(chunk) - len(chunk) % RECORD.size]  # Last record may be cut short
+            if not chunk:
+                break
+            for now, pid, priority, a, b, event, core in RECORD.iter_unpack(chunk):
+                yield now, EVENTS[event], pid, core, priority, a, b
+
+
+def export_chrome(path, out_path):
+    """
+    Convert a trace file to Chrome trace event JSON
+
+    :param path: file written by EventTracer
+    :param out_path: JSON file to write
+    :return: number of trace events written
+    """
+    written = 0
+    running = {}  # pid -> (time dispatched, core, priority)
+    cores = set()
+    memory_used = 0
+    last = 0
+
+    with open(out_path, 'w') as out:
+        def emit(event):
+            nonlocal written
+            out.write(",\n" if written else "")
+            out.write(json.dumps(event, separators=(',', ':')))
+            written += 1
+
+        def end_slice(pid, now):
+            started, core, priority = running.pop(pid)
+            emit({'name': "PID {0}".format(pid), 'cat': 'run', 'ph': 'X', 'ts': started, 'dur': now - started,
+                  'pid': 1, 'tid': core, 'args': {'pid': pid, 'priority': priority}})
+
+        out.write('{"traceEvents":[\n')
+        emit({'name': 'process_name', 'ph': 'M', 'pid': 1, 'args': {'name': 'CPU scheduling'}})
+        for now, event, pid, core, priority, a, b in read_events(path):
+            last = now
+            if event == 'dispatch':
+                if core not in cores:
+                    cores.add(core)
+                    emit({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': core,
+                          'args': {'name': "CPU {0}".format(core)}})
+                running[pid] = (now, core, priority)
+            elif event in ('preempt', 'terminate') and pid in running:
+                end_slice(pid, now)
+            if event in ('allocate', 'free'):
+                memory_used += b if event == 'allocate' else -b
+                emit({'name': 'memory', 'ph': 'C', 'ts': now, 'pid': 1, 'args': {'used': memory_used}})
+            elif event != 'dispatch' and event != 'preempt':
+                emit({'name': event, 'cat': 'job', 'ph': 'i', 's': 'p', 'ts': now, 'pid': 1, 'tid': 0,
+                      'args': {'pid': pid, 'priority': priority, 'remaining': a}})
+        for pid in list(running):
+            end_slice(pid, last)  # Still running when tracing stopped
+        out.write("\n]}\n")
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or convert a binary event trace")
+    parser.add_argument("trace", help="file written by EventTracer")
+    parser.add_argument("--chrome", default=None, help="write Chrome trace / Perfetto JSON here")
+    args = parser.parse_args()
+
+    if args.chrome:
+        print("{0} trace events written".format(export_chrome(args.trace, args.chrome)))
+    else:
+        counts = dict.fromkeys(EVENTS, 0)
+        for _, event, _, _, _, _, _ in read_events(args.trace):
+            counts[event] += 1
+        for event in EVENTS:
+            print("{0:10} {1}".format(event, counts[event]))
@@ -0,0 +1,119 @@
+"""
+NumPy ready pool for headless batch runs
+
+Needs numpy, which the GUI does not. policies registers the pool as
+'priority-numpy' only when numpy can be imported.
+"""
+import numpy as np
+from engine import ReadyPool, _pid_of
+
+
+class NumpyReadyPool(ReadyPool):
+    """
+    The GUI's priority ready pool with priority, age and required_time of the
+    waiting jobs kept in NumPy arrays, in queue order
+
+    Dispatch is a stable argsort on priority, aging everyone else is a handful
+    of array operations and the quantum is taken off in place, so a tick costs
+    a few vectorized passes instead of Python work per job. Results match
+    ReadyPool exactly: the stable sort keeps its tie order and the arithmetic
+    is the same float64 arithmetic Python does. Values are written back to a
+    PCB when it is handed out by get or leaves the pool.
+    """
+
+    def __init__(self, *args, capacity=64, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._size = 0
+        self._pids = np.zeros(capacity, dtype=np.int64)
+        self._priority = np.zeros(capacity, dtype=np.float64)
+        self._age = np.zeros(capacity, dtype=np.int64)
+        self._required_time = np.zeros(capacity, dtype=np.int64)
+        self._jobs = np.empty(capacity, dtype=object)
+        self._aging = np.asarray(self.aging_table, dtype=np.float64)
+
+    def __iter__(self):
+        for position in range(self._size):
+            self._write_back(position)
+        return iter(self._jobs[:self._size].tolist())
+
+    def _grow(self):
+        capacity = 2 * len(self._pids)
+        for name in ('_pids', '_priority', '_age', '_required_time', '_jobs'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype) if old.dtype != object else np.empty(capacity, dtype=object)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _position(self, pid):
+        if self._size and self._pids[0] == pid:
+            return 0  # The job just dispatched
+        return int(np.flatnonzero(self._pids[:self._size] == pid)[0])
+
+    def _write_back(self, position):
+        job = self._jobs[position]
+        job.priority = self._priority[position].item()
+        job.age = self._age[position].item()
+        job.required_time = self._required_time[position].item()
+
+    def add(self, job):
+        if self._size == len(self._pids):
+            self._grow()
+        position = self._size
+        self._pids[position] = job.pid
+        self._priority[position] = job.priority
+        self._age[position] = job.age
+        self._required_time[position] = job.required_time
+        self._jobs[position] = job
+        self._size += 1
+        self._pool[job.pid] = job
+        job.status = self.status
+
+    def remove(self, identifier):
+        job = self._pool.pop(_pid_of(identifier), None)
+        if job is None:
+            return None
+        position = self._position(job.pid)
+        self._write_back(position)
+        size = self._size
+        for column in (self._pids, self._priority, self._age, self._required_time, self._jobs):
+            column[position:size - 1] = column[position + 1:size]
+        self._jobs[size - 1] = None
+        self._size = size - 1
+        return job
+
+    def get(self):
+        size = self._size
+        order = np.argsort(self._priority[:size], kind='stable')
+        for column in (self._pids, self._priority, self._age, self._required_time, self._jobs):
+            column[:size] = column[:size][order]
+        self._write_back(0)
+        return self._jobs[0]
+
+    def change_priority(self, job):
+        size = self._size
+        position = self._position(job.pid)
+        priority, age = self._priority[:size], self._age[:size]
+
+        # Job running this time
+        age[position] = 0
+        if priority[position] < self.priority_max:
+            priority[position] += self.priority_add
+
+        # Everyone else ages one step, priority drops unless it would go below 0
+        others = np.ones(size, dtype=bool)
+        others[position] = False
+        aged = np.minimum(age[others] + 1, len(self._aging) - 1)
+        age[others] = aged
+        waiting = priority[others]
+        lowered = waiting - self._aging[aged]
+        priority[others] = np.where(lowered >= 0, lowered, waiting)
+
+        self._write_back(position)
+
+    def minus_time(self, job):
+        job.status = 'ready'
+        position = self._position(job.pid)
+        consumed = min(self.quantum, self._required_time[position].item())
+        self._required_time[position] -= consumed
+        job.required_time = self._required_time[position].item()
+        return consumed
@@ -0,0 +1,203 @@
+"""
+Synthetic workloads
+
+Draws whole batches of jobs at once with NumPy: arrival gaps from an arrival
+process, burst (required time) and memory from distributions. Everything comes
+from one seeded generator, so a seed always gives the same workload. Needs
+numpy, which the GUI does not.
+
+The output plugs into traces: records() feeds a traces.TraceReplay, and
+running this module writes a CSV trace for engine.py --trace.
+"""
+import argparse
+import sys
+import time
+import numpy as np
+from traces import TraceRecord
+
+BATCH_SIZE = 1 << 16
+
+
+# Arrival processes, each a function (rng, size) -> gaps before each job
+
+def poisson(rate):
+    """
+    :param rate: jobs per time unit
+    """
+
+    def gaps(rng, size):
+        return rng.exponential(1 / rate, size)
+
+    return gaps
+
+
+def bursty(rate, mean_burst):
+    """
+    Bursts arrive as a Poisson process, a burst brings a geometric number of
+    jobs at once
+
+    :param rate: bursts per time unit
+    :param mean_burst: mean jobs per burst
+    """
+
+    def gaps(rng, size):
+        starts_burst = rng.random(size) < 1 / mean_burst
+        return np.where(starts_burst, rng.exponential(1 / rate, size), 0.0)
+
+    return gaps
+
+
+# Distributions, each a function (rng, size) -> values
+
+def uniform(low, high):
+    """
+    Integers from low to high, both included, like random.randint
+    """
+
+    def draw(rng, size):
+        return rng.integers(int(low), int(high) + 1, size)
+
+    return draw
+
+
+def exponential(mean):
+    def draw(rng, size):
+        return rng.exponential(mean, size)
+
+    return draw
+
+
+def pareto(shape, minimum):
+    """
+    Heavy tail: most values near minimum, a few very large
+    """
+
+    def draw(rng, size):
+        return minimum * (1 + rng.pareto(shape, size))
+
+    return draw
+
+
+def bimodal(short, long, long_share):
+    """
+    Exponential around short or, for long_share of the jobs, around long
+    """
+
+    def draw(rng, size):
+        means = np.where(rng.random(size) < long_share, long, short)
+        return rng.exponential(1.0, size) * means
+
+    return draw
+
+
+ARRIVALS = {'poisson': poisson, 'bursty': bursty}
+DISTRIBUTIONS = {'uniform': uniform, 'exponential': exponential, 'pareto': pareto, 'bimodal': bimodal}
+
+
+class Workload(object):
+    """
+    Seeded job generator
+
+    Defaults draw priority, burst and memory the way PCB.random does, arriving
+    as a Poisson process of one job every 20 time units.
+    """
+
+    def __init__(self, arrival=None, burst=None, memory=None, priority=None, seed=None,
+                 max_burst=None, max_memory=None):
+        """
+        :param arrival: arrival process, poisson(1 / 20) by default
+        :param burst: distribution of required time, uniform(200, 1000) by default
+        :param memory: distribution of required memory, uniform(1, 10) by default
+        :param priority: distribution of priority, uniform(1, 7) by default
+        :param seed: seed for numpy.random.default_rng
+        :param max_burst: clip bursts to this, e.g. for heavy tails
+        :param max_memory: clip memory to this, e.g. total memory less the OS
+        """
+        self.arrival = arrival or poisson(1 / 20)
+        self.burst = burst or uniform(200, 1000)
+        self.memory = memory or uniform(1, 10)
+        self.priority = priority or uniform(1, 7)
+        self.max_burst = max_burst
+        self.max_memory = max_memory
+        self.rng = np.random.default_rng(seed)
+
+    def batches(self, count, batch_size=BATCH_SIZE):
+        """
+        Generate jobs in batches
+
+        :param count: number of jobs
+        :param batch_size: jobs per batch
+        :return: generator of dicts of int64 arrays 'arrival', 'priority', 'burst', 'memory'
+        """
+        rng = self.rng
+        clock = 0.0
+        while count > 0:
+            size = min(batch_size, count)
+            arrival = clock + np.cumsum(self.arrival(rng, size))
+            clock = arrival[-1]
+            yield {
+                'arrival': arrival.astype(np.int64),
+                'priority': np.maximum(1, np.rint(self.priority(rng, size))).astype(np.int64),
+                'burst': np.clip(np.rint(self.burst(rng, size)), 1, self.max_burst).astype(np.int64),
+                'memory': np.clip(np.rint(self.memory(rng, size)), 1, self.max_memory).astype(np.int64),
+            }
+            count -= size
+
+    def records(self, count, batch_size=BATCH_SIZE):
+        """
+        :param count: number of jobs
+        :return: generator of traces.TraceRecord, for traces.TraceReplay
+        """
+        for batch in self.batches(count, batch_size):
+            for arrival, priority, burst, memory in zip(batch['arrival'].tolist(), batch['priority'].tolist(),
+                                                        batch['burst'].tolist(), batch['memory'].tolist()):
+                yield TraceRecord(arrival, priority, burst, memory)
+
+    def write_csv(self, file, count, batch_size=BATCH_SIZE):
+        """
+        Write jobs as a CSV trace
+
+        :param file: open text file
+        :param count: number of jobs
+        """
+        file.write("arrival,priority,burst,memory\n")
+        for batch in self.batches(count, batch_size):
+            columns = np.column_stack((batch['arrival'], batch['priority'], batch['burst'], batch['memory']))
+            np.savetxt(file, columns, fmt='%d', delimiter=',')
+
+
+def _parse(spec, choices):
+    """
+    :param spec: name and numeric arguments split by colons, e.g. 'pareto:1.5:200'
+    :param choices: dict of name -> factory
+    :return: what the factory makes
+    """
+    name, *args = spec.split(':')
+    try:
+        factory = choices[name]
+    except KeyError:
+        raise ValueError("Unknown {0!r}, choose from {1}".format(name, ", ".join(sorted(choices))))
+    return factory(*(float(arg) for arg in args))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic workload as a CSV trace")
+    parser.add_argument("jobs", type=int, help="number of jobs")
+    parser.add_argument("--out", default=None, help="file to write, standard output by default")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--arrival", default='poisson:0.05', help="poisson:RATE or bursty:RATE:MEAN_BURST")
+    parser.add_argument("--burst", default='uniform:200:1000',
+                        help="uniform:LOW:HIGH, exponential:MEAN, pareto:SHAPE:MIN or bimodal:SHORT:LONG:LONG_SHARE")
+    parser.add_argument("--memory", default='uniform:1:10', help="distribution of memory, like --burst")
+    parser.add_argument("--max-memory", type=int, default=None, help="clip memory to this")
+    args = parser.parse_args()
+
+    workload = Workload(arrival=_parse(args.arrival, ARRIVALS), burst=_parse(args.burst, DISTRIBUTIONS),
+                        memory=_parse(args.memory, DISTRIBUTIONS), seed=args.seed, max_memory=args.max_memory)
+    started = time.perf_counter()
+    if args.out:
+        with open(args.out, 'w') as out:
+            workload.write_csv(out, args.jobs)
+    else:
+        workload.write_csv(sys.stdout, args.jobs)
+    print("{0} jobs in {1:.2f}s".format(args.jobs, time.perf_counter() - started), file=sys.stderr)